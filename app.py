@@ -5,13 +5,18 @@ GRE单词添加Web应用
 修复版：添加身份验证，增强错误处理，使用安全文件操作
 """
 
-from flask import Flask, request, render_template, redirect, url_for, flash, session
+from flask import Flask, Response, request, render_template, redirect, url_for, flash, session
 import csv
 import os
+import gzip
+import queue
 import hashlib
+import hmac
+import threading
+from collections import deque
 from datetime import date, datetime
-from functools import wraps
-from safe_csv import get_csv_handler
+from functools import lru_cache, wraps
+from safe_csv import get_csv_handler, SQLiteWordIndex
 
 app = Flask(__name__)
 
@@ -22,12 +27,43 @@ APP_PASSWORD = os.getenv('GRE_PASSWORD', 'gre2024')  # 默认密码，建议通
 CSV_FILE_PATH = os.getenv('GRE_CSV_PATH', '/home/your_user/gre_word_pusher/words.csv')
 
 app.secret_key = APP_SECRET_KEY
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 86400  # 静态文件缓存一天
+
+# 小于该大小的响应不值得压缩
+GZIP_MIN_SIZE = 500
+
+# 可选：服务端session存储（设置 REDIS_HOST 后启用，cookie中只保存session id）
+REDIS_HOST = os.getenv('REDIS_HOST')
+if REDIS_HOST:
+    try:
+        import redis
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'redis'
+        app.config['SESSION_REDIS'] = redis.Redis(host=REDIS_HOST, port=int(os.getenv('REDIS_PORT', '6379')))
+        Session(app)
+    except ImportError:
+        print("未安装 Flask-Session/redis，继续使用cookie session")
 
 # 简单的密码哈希（用于session验证）
+# 只用于配置的密码：首次登录时计算一次并缓存，导入模块时不做哈希
+@lru_cache(maxsize=4)
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return hashlib.sha256(password.encode()).digest()
+
 
-PASSWORD_HASH = hash_password(APP_PASSWORD)
+# 静态页面缓存：首次请求时渲染一次，之后直接返回渲染好的字节（调试模式下不缓存）
+_PAGE_CACHE = {}
+
+
+def render_cached(cache_key, template_name, **context):
+    """渲染不依赖请求数据的模板并缓存结果"""
+    if app.debug:
+        return render_template(template_name, **context)
+    page = _PAGE_CACHE.get(cache_key)
+    if page is None:
+        page = render_template(template_name, **context).encode('utf-8')
+        _PAGE_CACHE[cache_key] = page
+    return Response(page, mimetype='text/html')
 
 
 def login_required(f):
@@ -41,13 +77,40 @@ def login_required(f):
     return decorated_function
 
 
+@app.after_request
+def gzip_response(response):
+    """对HTML响应进行gzip压缩（登录提交的响应除外）"""
+    if request.endpoint == 'login' and request.method == 'POST':
+        return response
+    if (response.mimetype != 'text/html'
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    
+    # 压缩与否取决于Accept-Encoding：两种情况都要声明，共享缓存才不会把gzip内容发给不支持的客户端
+    response.vary.add('Accept-Encoding')
+    # accept_encodings按q值解析，"gzip;q=0"表示明确拒绝
+    if not request.accept_encodings['gzip']:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """登录页面"""
     if request.method == 'POST':
         password = request.form.get('password', '')
         
-        if hash_password(password) == PASSWORD_HASH:
+        # 常量时间比较，避免时序侧信道；用户输入不进入缓存
+        if hmac.compare_digest(hashlib.sha256(password.encode()).digest(), hash_password(APP_PASSWORD)):
             session['logged_in'] = True
             session['login_time'] = datetime.now().isoformat()
             flash('登录成功！')
@@ -55,7 +118,10 @@ def login():
         else:
             flash('密码错误，请重试')
     
-    return render_template('login.html')
+    # 有待显示的提示消息时需要实时渲染
+    if '_flashes' in session:
+        return render_template('login.html')
+    return render_cached('login', 'login.html')
 
 
 @app.route('/logout')
@@ -66,10 +132,81 @@ def logout():
     return redirect(url_for('login'))
 
 
+# 可选：用SQLite索引做查重（设置 GRE_WORD_INDEX_DB 后启用，适合超大词库，不占用进程内存）
+WORD_INDEX_DB = os.getenv('GRE_WORD_INDEX_DB')
+_word_index = SQLiteWordIndex(WORD_INDEX_DB, CSV_FILE_PATH) if WORD_INDEX_DB else None
+
+
+def warm_words_cache():
+    """
+    预先建立CSV处理器的单词集合，由 gunicorn.conf.py 的 when_ready 钩子在主进程中调用，
+    --preload 时各worker通过fork共享；导入模块时不做任何文件操作，CSV不存在时也不创建
+    """
+    if _word_index is not None or not os.path.exists(CSV_FILE_PATH):
+        return
+    get_csv_handler(CSV_FILE_PATH).word_exists('')
+
+
+# 写入队列：后台线程合并并发的追加请求，一批只加一次锁、fsync一次
+_write_q = queue.Queue()
+_writer_thread = None
+_WRITER_LOCK = threading.Lock()
+_WRITE_BATCH_MAX = 64
+_WRITE_TIMEOUT = 5  # 秒
+# 保护队列中条目的状态：queued（等待写入）-> writing（已被写入线程取走），或 queued -> cancelled（等待超时）
+_WRITE_STATE_LOCK = threading.Lock()
+
+
+def _csv_writer_loop():
+    """后台写入线程：取出队列中所有待写行，批量追加后逐个通知"""
+    while True:
+        batch = [_write_q.get()]
+        while len(batch) < _WRITE_BATCH_MAX:
+            try:
+                batch.append(_write_q.get_nowait())
+            except queue.Empty:
+                break
+
+        # 跳过已经超时放弃的条目；被取走的条目不能再取消
+        with _WRITE_STATE_LOCK:
+            batch = [item for item in batch if item['state'] != 'cancelled']
+            for item in batch:
+                item['state'] = 'writing'
+        if not batch:
+            continue
+
+        ok = False
+        try:
+            csv_handler = get_csv_handler(CSV_FILE_PATH)
+            rows = [item['row'] for item in batch]
+            stats = []
+            ok = csv_handler.append_words(rows, stats)
+            if ok and _word_index is not None:
+                # 整批一起写入索引，记录的CSV状态才覆盖这一批的所有行
+                try:
+                    _word_index.add(rows, *stats[0])
+                except Exception as e:
+                    print(f"更新单词索引失败: {e}")
+        finally:
+            # 已取走的条目一定要通知，等待方不会再超时取消它们
+            for item in batch:
+                item['ok'] = ok
+                item['event'].set()
+
+
+def _ensure_writer_thread():
+    """按需启动写入线程（在worker进程内启动，兼容 gunicorn --preload）"""
+    global _writer_thread
+    with _WRITER_LOCK:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_csv_writer_loop, name='csv-writer', daemon=True)
+            _writer_thread.start()
+
+
 def add_word_to_csv(word, definition):
     """
     向 CSV 文件安全追加一个新单词
-    使用安全的文件操作避免并发问题
+    通过写入队列交给后台线程批量写入，等待写入完成后返回
     """
     try:
         today_str = date.today().isoformat()
@@ -77,8 +214,21 @@ def add_word_to_csv(word, definition):
         # last_reviewed_date 初始化为添加日期，review_count 为 0
         new_row = [word.strip(), definition.strip(), today_str, today_str, '0']
         
-        csv_handler = get_csv_handler(CSV_FILE_PATH)
-        return csv_handler.append_word(new_row)
+        item = {'row': new_row, 'event': threading.Event(), 'ok': False, 'state': 'queued'}
+        _ensure_writer_thread()
+        _write_q.put(item)
+        if not item['event'].wait(timeout=_WRITE_TIMEOUT):
+            # 还在队列中就取消，保证返回失败时单词确实没有写入；
+            # 已经在写入中则等待真实的写入结果
+            with _WRITE_STATE_LOCK:
+                if item['state'] == 'queued':
+                    item['state'] = 'cancelled'
+            if item['state'] == 'cancelled':
+                print("添加单词到CSV文件超时")
+                return False
+            item['event'].wait()
+        # 单词集合由CSV处理器在追加时（同一把文件锁内）更新，SQLite索引由写入线程更新
+        return item['ok']
     except Exception as e:
         print(f"添加单词到CSV文件失败: {e}")
         return False
@@ -87,9 +237,11 @@ def add_word_to_csv(word, definition):
 def word_exists_safe(word):
     """
     安全检查单词是否存在
-    使用优化的检查方法，避免读取整个文件
+    使用CSV处理器的单词集合（或SQLite索引），避免每次添加都读取整个文件
     """
     try:
+        if _word_index is not None:
+            return _word_index.contains(word)
         csv_handler = get_csv_handler(CSV_FILE_PATH)
         return csv_handler.word_exists(word)
     except Exception as e:
@@ -134,13 +286,11 @@ def index():
         except Exception as e:
             flash(f'添加单词时出错: {str(e)}')
         
-        # 使用更稳定的重定向，添加小延迟以确保扩展脚本完成
-        import time
-        time.sleep(0.1)  # 100ms延迟
-        
         # 如果成功添加，在URL中添加成功标识
+        # 使用303重定向，等待扩展脚本的延迟交给前端处理，不占用worker
         redirect_url = url_for('index') + ('#success' if success else '')
-        response = redirect(redirect_url)
+        response = redirect(redirect_url, code=303)
+        response.headers['X-Add-Status'] = 'ok' if success else 'fail'
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache' 
         response.headers['Expires'] = '0'
@@ -149,40 +299,67 @@ def index():
     return render_template('index.html')
 
 
+def _csv_stat_key(path):
+    """返回用于校验缓存的 (mtime_ns, size)，文件不存在时返回None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+# /stats 统计缓存：CSV 的 (mtime, size) 不变时直接复用上次的结果
+_stats_cache = {'stat': None, 'snap': None}
+_STATS_LOCK = threading.Lock()
+
+
+def _compute_stats():
+    """单次遍历CSV计算统计数据"""
+    csv_handler = get_csv_handler(CSV_FILE_PATH)
+    all_words = csv_handler.read_all_words()
+
+    if not all_words:
+        return {'total': 0, 'new_words': 0, 'reviewed': 0, 'avg_reviews': 0, 'recent_words': []}
+
+    total_words = len(all_words)
+    new_words = 0
+    total_reviews = 0
+    recent_rows = deque(maxlen=5)  # 最近添加的5个单词
+
+    for row in all_words:
+        if len(row) >= 5:
+            if row[4] == '0':
+                new_words += 1
+            if row[4].isdigit():
+                total_reviews += int(row[4])
+        recent_rows.append(row)
+
+    recent_words = [{'word': row[0], 'definition': row[1], 'date': row[2]}
+                    for row in reversed(recent_rows) if len(row) >= 3]  # 最新的在前面
+
+    return {
+        'total': total_words,
+        'new_words': new_words,
+        'reviewed': total_words - new_words,
+        'avg_reviews': round(total_reviews / max(total_words, 1), 1),
+        'recent_words': recent_words,
+    }
+
+
 @app.route('/stats')
 @login_required 
 def stats():
     """简单的统计页面"""
     try:
-        csv_handler = get_csv_handler(CSV_FILE_PATH)
-        all_words = csv_handler.read_all_words()
-        
-        if not all_words:
-            return render_template('stats.html', 
-                                 total=0, new_words=0, reviewed=0, 
-                                 avg_reviews=0, recent_words=[])
-        
-        total_words = len(all_words)
-        new_words = sum(1 for row in all_words if len(row) >= 5 and row[4] == '0')
-        reviewed_words = total_words - new_words
+        # 复习状态日志变化也会影响统计
+        stat_key = (_csv_stat_key(CSV_FILE_PATH), _csv_stat_key(CSV_FILE_PATH + '.journal'))
+        with _STATS_LOCK:
+            if stat_key[0] is None or stat_key != _stats_cache['stat']:
+                _stats_cache['snap'] = _compute_stats()
+                _stats_cache['stat'] = stat_key
+            snap = _stats_cache['snap']
         
-        # 计算平均复习次数
-        total_reviews = sum(int(row[4]) for row in all_words if len(row) >= 5 and row[4].isdigit())
-        avg_reviews = round(total_reviews / max(total_words, 1), 1)
-        
-        # 最近添加的5个单词
-        recent_words = []
-        for row in all_words[-5:]:
-            if len(row) >= 3:
-                recent_words.append({'word': row[0], 'definition': row[1], 'date': row[2]})
-        recent_words.reverse()  # 最新的在前面
-        
-        return render_template('stats.html',
-                             total=total_words, 
-                             new_words=new_words,
-                             reviewed=reviewed_words,
-                             avg_reviews=avg_reviews,
-                             recent_words=recent_words)
+        return render_template('stats.html', **snap)
     
     except Exception as e:
         flash(f'获取统计信息失败: {str(e)}')
@@ -193,20 +370,27 @@ def stats():
 
 @app.errorhandler(404)
 def not_found(error):
-    return render_template('error.html', 
+    return render_cached('error_404', 'error.html', 
                          error_code=404, 
                          error_msg='页面未找到'), 404
 
 
 @app.errorhandler(500)
 def internal_error(error):
-    return render_template('error.html', 
+    return render_cached('error_500', 'error.html', 
                          error_code=500, 
                          error_msg='服务器内部错误'), 500
 
 
 if __name__ == '__main__':
-    # 这个仅用于本地测试，生产环境请使用 Gunicorn
+    # 这个仅用于本地测试，生产环境请使用 Gunicorn:
+    #   gunicorn -w 4 -k gevent --preload --bind 127.0.0.1:8000 app:app
+    import sys
+    if '--dev' not in sys.argv:
+        print("生产环境请使用: gunicorn -w 4 -k gevent --preload --bind 127.0.0.1:8000 app:app")
+        print("本地调试请使用: python3 app.py --dev")
+        sys.exit(1)
+    
     print("🚀 GRE单词管理系统启动中...")
     print(f"📁 数据文件路径: {CSV_FILE_PATH}")
     print(f"🔐 默认密码: {APP_PASSWORD} (请通过环境变量 GRE_PASSWORD 修改)")
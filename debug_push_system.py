@@ -7,13 +7,83 @@
 
 import os
 import csv
-import subprocess
-import requests
+from importlib.util import find_spec
 from datetime import date, datetime, timedelta
-import json
+
+# requests 和 subprocess 在用到它们的检查函数中才导入，缩短脚本启动时间
+_SESSION = None
+
+def _get_session():
+    """复用同一个连接池，避免每次请求都重新进行TCP+TLS握手"""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        _SESSION = requests.Session()
+        _SESSION.mount('https://', HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=4,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+    return _SESSION
+
+# 艾宾浩斯复习间隔（天），与 push_words.py 保持一致
+REVIEW_INTERVALS = [1, 2, 4, 7, 15, 30, 60]
+
+def _count_due_words_python(words, today):
+    """逐行统计新单词和到期单词数量"""
+    new_words = 0
+    due_words = 0
+    
+    for word_data in words:
+        try:
+            word, definition, added_date, last_reviewed, review_count = word_data[:5]
+            review_count = int(review_count)
+            
+            if review_count == 0:
+                new_words += 1
+            else:
+                # 计算是否到期
+                if last_reviewed:
+                    last_review_date = datetime.strptime(last_reviewed, '%Y-%m-%d').date()
+                    # 简化的到期判断
+                    interval = REVIEW_INTERVALS[min(review_count, len(REVIEW_INTERVALS) - 1)]
+                    next_review = last_review_date + timedelta(days=interval)
+                    
+                    if today >= next_review:
+                        due_words += 1
+        except (ValueError, IndexError):
+            continue
+    
+    return new_words, due_words
+
+def _count_due_words_numpy(words, today):
+    """用numpy向量化统计新单词和到期单词数量"""
+    import numpy as np
+    
+    review_counts = []
+    last_reviewed = []
+    for word_data in words:
+        try:
+            review_counts.append(int(word_data[4]))
+        except ValueError:
+            continue
+        last_reviewed.append(word_data[3])
+    
+    rc = np.array(review_counts, dtype=np.int64)
+    last = np.array(last_reviewed, dtype='datetime64[D]')  # 空日期解析为NaT，比较结果恒为False
+    intervals = np.array(REVIEW_INTERVALS, dtype='timedelta64[D]')
+    next_review = last + intervals[np.minimum(rc, len(REVIEW_INTERVALS) - 1)]
+    due_mask = (rc != 0) & (np.datetime64(today, 'D') >= next_review)
+    
+    return int((rc == 0).sum()), int(due_mask.sum())
 
 def check_environment():
     """检查系统环境"""
+    import subprocess
+    
     print("🔍 系统环境检查")
     print("="*50)
     
@@ -33,14 +103,16 @@ def check_environment():
     # 检查必要的包
     packages = ['requests']
     for package in packages:
-        try:
-            __import__(package)
+        # 只查找模块路径，不实际执行模块代码
+        if find_spec(package) is not None:
             print(f"✅ {package} 已安装")
-        except ImportError:
+        else:
             print(f"❌ {package} 未安装")
 
 def check_crontab():
     """检查定时任务配置"""
+    import subprocess
+    
     print("\n🕐 定时任务检查")
     print("="*50)
     
@@ -78,10 +150,26 @@ def check_files_and_permissions():
         "logs/cron.log"
     ]
     
+    # 每个目录只scandir一次，复用DirEntry缓存的stat
+    dir_entries = {}
+    
+    def _entries(directory):
+        if directory not in dir_entries:
+            try:
+                with os.scandir(directory) as it:
+                    dir_entries[directory] = {e.name: e for e in it}
+            except OSError:
+                dir_entries[directory] = {}
+        return dir_entries[directory]
+    
     for file_path in files_to_check:
         full_path = os.path.join(project_dir, file_path)
-        if os.path.exists(full_path):
-            stat_info = os.stat(full_path)
+        entry = _entries(os.path.dirname(full_path)).get(os.path.basename(full_path))
+        try:
+            stat_info = entry.stat() if entry is not None else None
+        except OSError:
+            stat_info = None
+        if stat_info is not None:
             permissions = oct(stat_info.st_mode)[-3:]
             size = stat_info.st_size
             print(f"✅ {file_path} - 权限:{permissions}, 大小:{size}字节")
@@ -95,6 +183,30 @@ def check_files_and_permissions():
                     print(f"   创建日志目录: {logs_dir}")
                     os.makedirs(logs_dir, exist_ok=True)
 
+def _read_env_file(env_path):
+    """一次性把.env解析成字典（优先使用python-dotenv，未安装时简单解析）"""
+    try:
+        from dotenv import dotenv_values
+        return dict(dotenv_values(env_path))
+    except ImportError:
+        pass
+    
+    values = {}
+    with open(env_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            key = key.strip()
+            if key.startswith('export '):
+                key = key[len('export '):].strip()
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+                value = value[1:-1]
+            values[key] = value
+    return values
+
 def check_configuration():
     """检查配置文件"""
     print("\n⚙️ 配置检查")
@@ -111,18 +223,16 @@ def check_configuration():
     if os.path.exists(env_path):
         print(f"✅ 找到配置文件: {env_path}")
         try:
-            with open(env_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line.startswith('NTFY_TOPIC='):
-                        config['ntfy_topic'] = line.split('=', 1)[1].strip()
-                        print(f"   NTFY主题: {config['ntfy_topic']}")
-                    elif line.startswith('GRE_CSV_PATH='):
-                        config['csv_path'] = line.split('=', 1)[1].strip()
-                        print(f"   CSV路径: {config['csv_path']}")
-                    elif line.startswith('WORDS_PER_PUSH='):
-                        config['words_per_push'] = line.split('=', 1)[1].strip()
-                        print(f"   推送单词数: {config['words_per_push']}")
+            env_values = _read_env_file(env_path)
+            if env_values.get('NTFY_TOPIC'):
+                config['ntfy_topic'] = env_values['NTFY_TOPIC']
+                print(f"   NTFY主题: {config['ntfy_topic']}")
+            if env_values.get('GRE_CSV_PATH'):
+                config['csv_path'] = env_values['GRE_CSV_PATH']
+                print(f"   CSV路径: {config['csv_path']}")
+            if env_values.get('WORDS_PER_PUSH'):
+                config['words_per_push'] = env_values['WORDS_PER_PUSH']
+                print(f"   推送单词数: {config['words_per_push']}")
         except Exception as e:
             print(f"❌ 读取配置文件失败: {e}")
     else:
@@ -140,11 +250,21 @@ def check_csv_data(csv_path):
         return []
     
     try:
+        # 推送脚本把复习状态追加在日志里，读取时覆盖到同一单词的行上
+        try:
+            from safe_csv import get_csv_handler
+            journal = get_csv_handler(csv_path).read_journal()
+        except ImportError:
+            journal = {}
+        
         words = []
-        with open(csv_path, 'r', encoding='utf-8') as f:
+        # 1MB读缓冲，newline='' 交给csv模块处理字段内换行
+        with open(csv_path, 'r', encoding='utf-8', buffering=1 << 20, newline='') as f:
             reader = csv.reader(f)
             for i, row in enumerate(reader):
                 if len(row) >= 5:
+                    if row[0] in journal:
+                        row[3], row[4] = journal[row[0]]
                     words.append(row)
                 else:
                     print(f"⚠️ 第{i+1}行数据格式不完整: {row}")
@@ -153,29 +273,11 @@ def check_csv_data(csv_path):
         
         # 分析需要复习的单词
         today = date.today()
-        new_words = 0
-        due_words = 0
-        
-        for word_data in words:
-            try:
-                word, definition, added_date, last_reviewed, review_count = word_data[:5]
-                review_count = int(review_count)
-                
-                if review_count == 0:
-                    new_words += 1
-                else:
-                    # 计算是否到期
-                    if last_reviewed:
-                        last_review_date = datetime.strptime(last_reviewed, '%Y-%m-%d').date()
-                        # 简化的到期判断
-                        intervals = [1, 2, 4, 7, 15, 30, 60]
-                        interval = intervals[min(review_count, len(intervals) - 1)]
-                        next_review = last_review_date + timedelta(days=interval)
-                        
-                        if today >= next_review:
-                            due_words += 1
-            except (ValueError, IndexError):
-                continue
+        try:
+            new_words, due_words = _count_due_words_numpy(words, today)
+        except (ImportError, ValueError):
+            # 未安装numpy或日期格式不规范时逐行处理
+            new_words, due_words = _count_due_words_python(words, today)
         
         print(f"   新单词: {new_words} 个")
         print(f"   到期复习: {due_words} 个")
@@ -200,8 +302,10 @@ def check_network_connectivity(ntfy_topic):
         return False
     
     try:
+        session = _get_session()
+        
         # 测试基本连接
-        response = requests.get("https://ntfy.sh", timeout=10)
+        response = session.get("https://ntfy.sh", timeout=10)
         if response.status_code == 200:
             print("✅ ntfy.sh 服务可访问")
         else:
@@ -216,10 +320,9 @@ def check_network_connectivity(ntfy_topic):
             "title": "🔧 系统测试"
         }
         
-        response = requests.post(
+        response = session.post(
             "https://ntfy.sh/",
-            data=json.dumps(payload),
-            headers={"Content-Type": "application/json"},
+            json=payload,
             timeout=15
         )
         
@@ -238,6 +341,8 @@ def check_network_connectivity(ntfy_topic):
 
 def check_push_script():
     """检查推送脚本"""
+    import subprocess
+    
     print("\n🐍 推送脚本检查")
     print("="*50)
     
@@ -293,6 +398,23 @@ def check_push_script():
         print(f"❌ 脚本检查失败: {e}")
         return False
 
+def _tail_lines(path, n=20, block_size=8192):
+    """读取文件最后n行：从文件末尾按块向前读取，不启动tail进程"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        read_size = block_size
+        while True:
+            start = max(0, size - read_size)
+            f.seek(start)
+            data = f.read(size - start)
+            lines = data.splitlines()
+            # 块内行数不足且未读到文件开头时扩大读取范围（首行可能不完整，需多读一行）
+            if len(lines) > n or start == 0:
+                break
+            read_size *= 2
+    return [line.decode('utf-8', errors='replace') for line in lines[-n:]]
+
 def check_cron_logs():
     """检查cron日志"""
     print("\n📋 定时任务日志检查")
@@ -309,15 +431,11 @@ def check_cron_logs():
             print(f"✅ 找到日志文件: {log_path}")
             try:
                 # 读取最后20行
-                result = subprocess.run(
-                    ['tail', '-20', log_path], 
-                    capture_output=True, 
-                    text=True
-                )
+                tail_lines = _tail_lines(log_path, 20)
                 
-                if result.stdout:
+                if tail_lines:
                     print(f"最近的日志内容:")
-                    print(result.stdout)
+                    print('\n'.join(tail_lines))
                 else:
                     print("日志文件为空")
                     
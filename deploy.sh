@@ -97,6 +97,7 @@ copy_files() {
         "safe_csv.py"
         "push_words.py" 
         "app.py"
+        "gunicorn.conf.py"
         "health_check.py"
         "templates/login.html"
         "templates/index.html"
@@ -58,6 +58,7 @@ fi
 info "检查修复文件..."
 files_to_deploy=(
     "push_words_fixed.py"
+    "gre_push_core.py"
     "test_push.py"
     "app.py"
     "templates/index.html"
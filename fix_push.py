@@ -5,9 +5,19 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from datetime import datetime
 
+# 复用同一个连接池，避免每次请求都重新进行TCP+TLS握手
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+))
+
 def test_push_methods(topic, words_data):
     """测试不同的推送方法"""
     
@@ -27,7 +37,7 @@ def test_push_methods(topic, words_data):
             "tags": ["brain", "study"]
         }
         
-        response = requests.post(
+        response = _SESSION.post(
             "https://ntfy.sh/",
             json=payload,
             headers={"Content-Type": "application/json"},
@@ -55,7 +65,7 @@ def test_push_methods(topic, words_data):
             "tags": "brain,study"
         }
         
-        response = requests.post(
+        response = _SESSION.post(
             f"https://ntfy.sh/{topic}",
             data=test_message.encode('utf-8'),
             params=params,
@@ -78,7 +88,7 @@ def test_push_methods(topic, words_data):
     try:
         english_message = "Test: ubiquitous (everywhere, common)"
         
-        response = requests.post(
+        response = _SESSION.post(
             f"https://ntfy.sh/{topic}",
             data=english_message,
             headers={
@@ -217,8 +227,8 @@ if __name__ == "__main__":
                 if line.startswith('NTFY_TOPIC='):
                     topic = line.split('=', 1)[1].strip()
                     break
-        else:
-            topic = "gre-words-test"
+            else:
+                topic = "gre-words-test"
     except:
         topic = "gre-words-test"
     
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GRE单词推送脚本的公共部分
+push_words_fixed.py 和 push_words_final_fix.py 共用的配置加载、选词、状态更新和失败记录，
+两个脚本只各自实现推送方式
+"""
+
+import heapq
+import json
+import random
+import time
+from datetime import date, timedelta, datetime, timezone
+from email.utils import parsedate_to_datetime
+from operator import itemgetter
+
+import requests
+
+from safe_csv import get_csv_handler
+
+# 各种推送方法和重试共用同一个连接池，同一主机的TCP+TLS连接只建立一次
+SESSION = requests.Session()
+
+
+# 重试等待：服务器限流时按Retry-After等待，其余失败指数退避并加随机抖动
+RETRY_BASE_SECONDS = 1
+RETRY_MAX_WAIT_SECONDS = 60
+
+
+def _retry_after_seconds(response):
+    """解析429/503响应的Retry-After头（秒数或HTTP日期），没有或无法解析时返回None"""
+    if response is None or response.status_code not in (429, 503):
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_permanent_failure(response):
+    """除超时和限流外的4xx错误重试同一种推送方式也不会成功，应直接换下一种方式"""
+    return 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+
+
+def wait_for_retry(response, attempt):
+    """两次尝试之间等待，最长RETRY_MAX_WAIT_SECONDS秒"""
+    delay = _retry_after_seconds(response)
+    if delay is None:
+        delay = RETRY_BASE_SECONDS * 2 ** attempt + random.uniform(0, RETRY_BASE_SECONDS)
+    time.sleep(min(delay, RETRY_MAX_WAIT_SECONDS))
+
+
+def dumps_json(payload):
+    """把推送负载序列化成UTF-8字节；装了orjson就用它（直接输出bytes），否则退回标准库json"""
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(payload).encode("utf-8")
+    return orjson.dumps(payload)
+
+
+# --- 配置区 ---
+NTFY_TOPIC = "gre-words-for-my-awesome-life-123xyz"
+CSV_FILE_PATH = "/root/gre_word_pusher/words.csv"
+WORDS_PER_PUSH = 15
+
+# --- 艾宾浩斯记忆曲线间隔 (天) ---
+REVIEW_INTERVALS = [1, 2, 4, 7, 15, 30, 60]
+# 各阶段间隔预先构造成timedelta，逐行计算时直接按阶段取用
+_REVIEW_DELTAS = [timedelta(days=days) for days in REVIEW_INTERVALS]
+_MAX_STAGE = len(REVIEW_INTERVALS) - 1
+
+
+def load_config():
+    """从环境变量文件加载配置"""
+    global NTFY_TOPIC, CSV_FILE_PATH, WORDS_PER_PUSH
+    
+    try:
+        import os
+        # 尝试从环境变量读取
+        NTFY_TOPIC = os.getenv('NTFY_TOPIC', NTFY_TOPIC)
+        CSV_FILE_PATH = os.getenv('GRE_CSV_PATH', CSV_FILE_PATH)
+        
+        # 尝试从.env文件读取
+        env_file = '/root/gre_word_pusher/.env'
+        if os.path.exists(env_file):
+            with open(env_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith('NTFY_TOPIC='):
+                        NTFY_TOPIC = line.split('=', 1)[1].strip()
+                    elif line.startswith('GRE_CSV_PATH='):
+                        CSV_FILE_PATH = line.split('=', 1)[1].strip()
+                    elif line.startswith('WORDS_PER_PUSH='):
+                        try:
+                            WORDS_PER_PUSH = int(line.split('=', 1)[1].strip())
+                        except ValueError:
+                            pass
+        
+        print(f"📋 配置加载完成:")
+        print(f"   NTFY主题: {NTFY_TOPIC}")
+        print(f"   CSV路径: {CSV_FILE_PATH}")
+        print(f"   推送数量: {WORDS_PER_PUSH}")
+        
+    except Exception as e:
+        print(f"⚠️ 配置加载失败，使用默认值: {e}")
+
+
+def get_review_words(file_path, num_words):
+    """
+    基于艾宾浩斯记忆曲线挑选单词。
+    优先级: 1. 新词 (review_count=0)  2. 到达复习日期的词
+    使用安全的文件操作
+    """
+    csv_handler = get_csv_handler(file_path)
+    all_words = csv_handler.read_all_words()
+    
+    if not all_words:
+        print("📁 CSV文件为空或不存在")
+        return [], [], set()
+
+    today = date.today()
+    due_words = []
+    
+    # 1. 筛选出所有新词和到期的词
+    for i, row in enumerate(all_words):
+        try:
+            if len(row) < 5:
+                print(f"⚠️ 跳过格式不完整的行 {i+1}: {row}")
+                continue
+                
+            word, definition, added_date, last_reviewed_date, review_count_str = row
+            review_count = int(review_count_str)
+            
+            # 优先处理新词 
+            if review_count == 0:
+                due_words.append((row, -999, i))  # 用-999保证新词排序最前
+                continue
+
+            # 计算下一次复习日期
+            try:
+                last_review_dt = datetime.strptime(last_reviewed_date, '%Y-%m-%d').date()
+            except ValueError:
+                print(f"⚠️ 跳过日期格式错误的行 {i+1}: {row}")
+                continue
+                
+            # 加上当前阶段对应的间隔天数
+            next_review_date = last_review_dt + _REVIEW_DELTAS[min(review_count, _MAX_STAGE)]
+
+            if today >= next_review_date:
+                days_overdue = (today - next_review_date).days
+                due_words.append((row, days_overdue, i))  # 记录原始索引
+                
+        except (ValueError, IndexError) as e:
+            print(f"⚠️ 跳过格式错误的行 {i+1}: {row}. 错误: {e}")
+            continue
+
+    # 2. 按优先级取前num_words个：最逾期的 > 新词 > 刚到期的（同优先级保持文件顺序）
+    words_to_review_with_indices = heapq.nlargest(num_words, due_words, key=itemgetter(1))
+    
+    # 3. 提取要复习的单词列表和它们的原始索引
+    words_to_review = [item[0] for item in words_to_review_with_indices]
+    original_indices = {item[2] for item in words_to_review_with_indices}
+
+    return words_to_review, all_words, original_indices
+
+
+def build_messages(words_to_review):
+    """
+    构造各种推送方式共用的消息正文，只遍历一次单词列表（编号沿用原列表中的位置）
+    返回 (带释义的正文, 只有英文单词的正文)，没有有效单词数据时都是空字符串
+    """
+    valid = [(i, word_data[0], word_data[1])
+             for i, word_data in enumerate(words_to_review, 1) if len(word_data) >= 2]
+    chinese = "\n".join([f"{i}. {word}: {definition}" for i, word, definition in valid])
+    english = "\n".join([f"{i}. {word}" for i, word, _ in valid])
+    return chinese, english
+
+
+def send_with_fallbacks(topic, words_to_review, methods, max_retries=2):
+    """
+    依次尝试各种推送方式，直到有一种成功；全部失败时记录失败日志
+    methods: [(开始尝试时打印的提示, 推送函数(topic, words_to_review, messages, max_retries)), ...]，
+    messages 为 build_messages 的结果，所有方式共用
+    """
+    if not words_to_review:
+        print("📭 没有需要复习的单词。")
+        return False
+        
+    print(f"📱 开始推送 {len(words_to_review)} 个单词...")
+    
+    messages = build_messages(words_to_review)
+    for hint, send in methods:
+        print(hint)
+        if send(topic, words_to_review, messages, max_retries):
+            return True
+    
+    print("❌ 所有推送方法都失败了")
+    log_failed_notification(words_to_review)
+    return False
+
+
+def update_and_save_words(file_path, all_words, reviewed_indices):
+    """
+    更新复习过的单词的状态并安全写回文件
+    只按索引处理复习过的几行，并追加到复习状态日志，不再遍历和重写整个CSV
+    """
+    if not reviewed_indices:
+        return
+        
+    today_str = date.today().isoformat()
+    updates = []
+    
+    for i in reviewed_indices:
+        row = all_words[i]
+        if len(row) >= 5:
+            row[3] = today_str  # 更新上次复习日期
+            row[4] = str(int(row[4]) + 1)  # 记忆阶段+1
+            updates.append((row[0], row[3], row[4]))
+    
+    csv_handler = get_csv_handler(file_path)
+    try:
+        csv_handler.append_review_updates(updates)
+        print(f"✅ 成功更新 {len(updates)} 个单词的复习状态")
+    except Exception as e:
+        print(f"❌ 更新单词状态失败: {e}")
+
+
+# 推送失败日志超过该大小时轮转，保留FAILED_LOG_BACKUPS个旧文件
+FAILED_LOG_MAX_BYTES = 1024 * 1024
+FAILED_LOG_BACKUPS = 3
+
+_failed_logger = None
+
+
+def _get_failed_logger():
+    """推送失败日志（首次失败时按当前CSV_FILE_PATH打开，之后复用同一个文件句柄）"""
+    global _failed_logger
+    if _failed_logger is None:
+        import logging
+        from logging.handlers import RotatingFileHandler
+        
+        handler = RotatingFileHandler(
+            CSV_FILE_PATH.replace('.csv', '_failed_notifications.log'),
+            maxBytes=FAILED_LOG_MAX_BYTES,
+            backupCount=FAILED_LOG_BACKUPS,
+            encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger = logging.getLogger('gre.failed_notifications')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _failed_logger = logger
+    return _failed_logger
+
+
+def log_failed_notification(words_to_review):
+    """记录推送失败的单词，供后续重试"""
+    try:
+        timestamp = datetime.now().isoformat()
+        lines = [f"\n--- {timestamp} ---"]
+        for word_data in words_to_review:
+            if len(word_data) >= 2:
+                lines.append(f"{word_data[0]}: {word_data[1]}")
+        lines.append("--- End ---")
+        
+        logger = _get_failed_logger()
+        logger.info("\n".join(lines))
+        
+        print(f"📝 失败的推送已记录到: {logger.handlers[0].baseFilename}")
+    except Exception as e:
+        print(f"❌ 记录失败日志时出错: {e}")
+
+
+def main(send_notification, title="🚀 GRE单词推送系统启动"):
+    """脚本入口：加载配置、选词、推送，推送成功后更新复习状态"""
+    print("="*50)
+    print(title)
+    print(f"⏰ 执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*50)
+    
+    try:
+        # 1. 加载配置
+        load_config()
+        
+        # 2. 获取需要复习的单词
+        print("\n📚 分析需要复习的单词...")
+        review_list, all_data, reviewed_idx = get_review_words(CSV_FILE_PATH, WORDS_PER_PUSH)
+        
+        if review_list:
+            print(f"📋 找到 {len(review_list)} 个需要复习的单词:")
+            for i, word_data in enumerate(review_list[:5], 1):  # 显示前5个
+                if len(word_data) >= 2:
+                    print(f"   {i}. {word_data[0]}: {word_data[1]}")
+            if len(review_list) > 5:
+                print(f"   ... 还有 {len(review_list)-5} 个单词")
+            
+            # 3. 发送推送
+            success = send_notification(NTFY_TOPIC, review_list)
+            
+            # 4. 更新复习状态
+            if success:
+                update_and_save_words(CSV_FILE_PATH, all_data, reviewed_idx)
+                print("✅ 推送成功，单词状态已更新")
+            else:
+                print("❌ 由于推送失败，未更新单词状态")
+        else:
+            print("📭 今天没有需要复习的单词")
+            
+    except Exception as e:
+        print(f"❌ 脚本执行出错: {e}")
+        import traceback
+        traceback.print_exc()
+    
+    print("\n" + "="*50)
+    print(f"🏁 任务完成: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*50)
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gunicorn 配置钩子
+gunicorn 启动时自动加载工作目录下的本文件，命令行参数（workers、bind等）保持不变
+"""
+
+
+def when_ready(server):
+    """
+    主进程启动完成、fork出worker之前调用
+    --preload 时应用已在主进程中导入，在这里建立单词查重缓存，各worker通过fork共享同一份
+    """
+    if not server.cfg.preload_app:
+        return
+    import app
+    app.warm_words_cache()
@@ -6,13 +6,139 @@ GRE单词系统健康检查和监控工具
 """
 
 import os
+import re
 import csv
 import json
 import time
-import requests
+import asyncio
+import contextvars
+import threading
+from collections import Counter
 from datetime import datetime, date, timedelta
+from functools import lru_cache
 from pathlib import Path
-from safe_csv import get_csv_handler
+from safe_csv import get_csv_handler, WordColumns
+
+# 并发执行检查时，每个检查把结果写进自己的列表，最后按固定顺序合并
+_current_results = contextvars.ContextVar('health_check_results', default=None)
+
+_STATUS_ICONS = {
+    'OK': '✅',
+    'WARNING': '⚠️',
+    'ERROR': '❌',
+    'INFO': 'ℹ️'
+}
+
+# CPU使用率的最短采样时间（秒）
+CPU_MIN_SAMPLE_SECONDS = 0.1
+
+# requests 只在网络检查中才导入，缩短cron运行时的脚本启动时间
+_SESSION = None
+
+
+def _get_session():
+    """复用同一个连接池，避免每次请求都重新进行TCP+TLS握手"""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        _SESSION = requests.Session()
+    return _SESSION
+
+
+# CSV超过该大小时用NumPy分块向量化校验（未安装NumPy则逐行校验）
+_NUMPY_VALIDATE_MIN_BYTES = 256 * 1024
+_VALIDATE_CHUNK_ROWS = 50000
+
+
+class _IntegrityTally:
+    """数据完整性检查的累计结果"""
+    
+    def __init__(self):
+        self.total = 0
+        self.valid = 0
+        self.invalid_count = 0
+        self.invalid_rows = []  # 只保留前5条用于报告
+        self.duplicate_words = set()
+        self.word_set = set()
+    
+    def add_invalid(self, message):
+        self.invalid_count += 1
+        if len(self.invalid_rows) < 5:
+            self.invalid_rows.append(message)
+    
+    def track_word(self, word):
+        """记录一个单词，之前出现过的（忽略大小写）计为重复"""
+        word_lower = word.lower()
+        if word_lower in self.word_set:
+            self.duplicate_words.add(word)
+        else:
+            self.word_set.add(word_lower)
+    
+    def track_words(self, words):
+        """批量记录单词：整体建集合判断有无重复，只有存在重复时才按出现顺序逐个处理"""
+        lowered = list(map(str.lower, words))
+        unique = set(lowered)
+        if len(unique) < len(lowered) or not self.word_set.isdisjoint(unique):
+            for word, word_lower in zip(words, lowered):
+                if word_lower in self.word_set:
+                    self.duplicate_words.add(word)
+                else:
+                    self.word_set.add(word_lower)
+        else:
+            self.word_set |= unique
+
+
+# 格式规范的行尾（补零日期、纯数字复习次数）：三列用逗号拼接后一次fullmatch判定，
+# 任一字段内含逗号或格式不规范都会匹配失败，转回逐项校验
+_CLEAN_TAIL_RE = re.compile(r'(\d{4}-\d{2}-\d{2}),(\d{4}-\d{2}-\d{2}),\d+', re.ASCII)
+
+
+@lru_cache(maxsize=4096)
+def _is_calendar_date(value):
+    """YYYY-MM-DD形式的字符串是否为真实存在的日期（同一文件中日期大量重复，结果缓存）"""
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _row_is_clean(row):
+    """快速判定：5列、单词释义非空、日期与复习次数格式规范的行一定有效"""
+    if len(row) != 5 or not row[0] or not row[1]:
+        return False
+    match = _CLEAN_TAIL_RE.fullmatch(f'{row[2]},{row[3]},{row[4]}')
+    return match is not None and _is_calendar_date(match[1]) and _is_calendar_date(match[2])
+
+
+def _row_problem(i, row):
+    """校验单行数据，返回问题描述；数据有效时返回None"""
+    # 检查行格式
+    if len(row) < 5:
+        return f'行{i+1}: 列数不足({len(row)}<5)'
+    
+    word, definition, added_date, last_reviewed_date, review_count = row
+    
+    # 检查必填字段
+    if not word or not definition:
+        return f'行{i+1}: 单词或释义为空'
+    
+    # 检查日期格式
+    try:
+        datetime.strptime(added_date, '%Y-%m-%d')
+        datetime.strptime(last_reviewed_date, '%Y-%m-%d')
+    except ValueError:
+        return f'行{i+1}: 日期格式错误'
+    
+    # 检查复习次数
+    try:
+        count = int(review_count)
+        if count < 0:
+            return f'行{i+1}: 复习次数为负数'
+    except ValueError:
+        return f'行{i+1}: 复习次数格式错误'
+    
+    return None
 
 
 class HealthChecker:
@@ -23,6 +149,29 @@ class HealthChecker:
         self.csv_file_path = self.config.get('csv_file_path', '/home/your_user/gre_word_pusher/words.csv')
         self.ntfy_topic = self.config.get('ntfy_topic', 'gre-words-for-my-awesome-life-123xyz')
         self.results = []
+        self._counts = None  # (结果数量, 各状态计数) 缓存
+        self._csv_stat_result = None  # 本轮检查共享的CSV stat结果
+        self._csv_stat_lock = threading.Lock()
+        self._init_cpu_sampling()
+    
+    def _init_cpu_sampling(self):
+        """预热CPU采样：之后的cpu_percent(interval=None)返回从这里开始的平均使用率"""
+        self._cpu_sampled_at = time.monotonic()
+        try:
+            import psutil
+            psutil.cpu_percent(interval=None)
+        except ImportError:
+            pass
+    
+    def _csv_stat(self):
+        """本轮检查中CSV的stat结果，各项检查共享同一次stat；文件不存在时返回None"""
+        with self._csv_stat_lock:
+            if self._csv_stat_result is None:
+                try:
+                    self._csv_stat_result = os.stat(self.csv_file_path)
+                except OSError:
+                    return None
+            return self._csv_stat_result
     
     def _load_config(self, config_path):
         """加载配置文件"""
@@ -44,6 +193,11 @@ class HealthChecker:
         
         return default_config
     
+    def _add(self, status, title, message):
+        """记录一条检查结果"""
+        bucket = _current_results.get()
+        (self.results if bucket is None else bucket).append((status, title, message))
+    
     def check_file_system(self):
         """检查文件系统状态"""
         print("🔍 检查文件系统...")
@@ -51,41 +205,49 @@ class HealthChecker:
         # 检查CSV文件
         try:
             csv_path = Path(self.csv_file_path)
+            csv_stat = self._csv_stat()
             
-            if not csv_path.exists():
-                self.results.append(('ERROR', '数据文件不存在', f'CSV文件不存在: {csv_path}'))
+            if csv_stat is None:
+                self._add('ERROR', '数据文件不存在', f'CSV文件不存在: {csv_path}')
                 return False
             
             # 检查文件大小
-            file_size_mb = csv_path.stat().st_size / 1024 / 1024
+            file_size_mb = csv_stat.st_size / 1024 / 1024
             max_size = self.config['max_file_size_mb']
             
             if file_size_mb > max_size:
-                self.results.append(('WARNING', '文件过大', f'CSV文件大小: {file_size_mb:.2f}MB > {max_size}MB'))
+                self._add('WARNING', '文件过大', f'CSV文件大小: {file_size_mb:.2f}MB > {max_size}MB')
             else:
-                self.results.append(('OK', '文件大小正常', f'CSV文件大小: {file_size_mb:.2f}MB'))
+                self._add('OK', '文件大小正常', f'CSV文件大小: {file_size_mb:.2f}MB')
+            
+            # 在同一个目录fd上检查权限和磁盘空间，不再重复解析路径
+            dir_fd = os.open(csv_path.parent, getattr(os, 'O_PATH', os.O_RDONLY) | os.O_DIRECTORY)
+            try:
+                accessible = os.access(csv_path.name, os.R_OK | os.W_OK, dir_fd=dir_fd)
+                disk_usage = os.fstatvfs(dir_fd)
+            finally:
+                os.close(dir_fd)
             
             # 检查文件权限
-            if not os.access(csv_path, os.R_OK | os.W_OK):
-                self.results.append(('ERROR', '文件权限不足', '无法读写CSV文件'))
+            if not accessible:
+                self._add('ERROR', '文件权限不足', '无法读写CSV文件')
                 return False
             else:
-                self.results.append(('OK', '文件权限正常', '可读写CSV文件'))
+                self._add('OK', '文件权限正常', '可读写CSV文件')
             
             # 检查磁盘空间
-            disk_usage = os.statvfs(csv_path.parent)
             free_space_mb = (disk_usage.f_bavail * disk_usage.f_frsize) / 1024 / 1024
             min_space = self.config['min_free_space_mb']
             
             if free_space_mb < min_space:
-                self.results.append(('ERROR', '磁盘空间不足', f'剩余空间: {free_space_mb:.2f}MB < {min_space}MB'))
+                self._add('ERROR', '磁盘空间不足', f'剩余空间: {free_space_mb:.2f}MB < {min_space}MB')
             else:
-                self.results.append(('OK', '磁盘空间充足', f'剩余空间: {free_space_mb:.2f}MB'))
+                self._add('OK', '磁盘空间充足', f'剩余空间: {free_space_mb:.2f}MB')
             
             return True
             
         except Exception as e:
-            self.results.append(('ERROR', '文件系统检查失败', str(e)))
+            self._add('ERROR', '文件系统检查失败', str(e))
             return False
     
     def check_data_integrity(self):
@@ -94,84 +256,122 @@ class HealthChecker:
         
         try:
             csv_handler = get_csv_handler(self.csv_file_path)
-            all_words = csv_handler.read_all_words()
             
-            if not all_words:
-                self.results.append(('WARNING', '数据为空', '没有找到单词数据'))
-                return True
+            tally = None
+            csv_stat = self._csv_stat()
+            if csv_stat is not None and csv_stat.st_size >= _NUMPY_VALIDATE_MIN_BYTES:
+                try:
+                    tally = self._validate_rows_numpy(csv_handler)
+                except ImportError:
+                    pass
+            if tally is None:
+                tally = self._validate_rows(csv_handler)
             
-            total_words = len(all_words)
-            valid_words = 0
-            invalid_rows = []
-            duplicate_words = set()
-            word_set = set()
+            total_words = tally.total
+            valid_words = tally.valid
+            invalid_count = tally.invalid_count
+            invalid_rows = tally.invalid_rows
+            duplicate_words = tally.duplicate_words
             
-            for i, row in enumerate(all_words):
-                # 检查行格式
-                if len(row) < 5:
-                    invalid_rows.append(f'行{i+1}: 列数不足({len(row)}<5)')
-                    continue
-                
-                word, definition, added_date, last_reviewed_date, review_count = row
-                
-                # 检查必填字段
-                if not word or not definition:
-                    invalid_rows.append(f'行{i+1}: 单词或释义为空')
-                    continue
-                
-                # 检查重复
-                word_lower = word.lower()
-                if word_lower in word_set:
-                    duplicate_words.add(word)
-                else:
-                    word_set.add(word_lower)
-                
-                # 检查日期格式
-                try:
-                    datetime.strptime(added_date, '%Y-%m-%d')
-                    datetime.strptime(last_reviewed_date, '%Y-%m-%d')
-                except ValueError:
-                    invalid_rows.append(f'行{i+1}: 日期格式错误')
-                    continue
-                
-                # 检查复习次数
-                try:
-                    count = int(review_count)
-                    if count < 0:
-                        invalid_rows.append(f'行{i+1}: 复习次数为负数')
-                        continue
-                except ValueError:
-                    invalid_rows.append(f'行{i+1}: 复习次数格式错误')
-                    continue
-                
-                valid_words += 1
+            if total_words == 0:
+                self._add('WARNING', '数据为空', '没有找到单词数据')
+                return True
             
             # 报告结果
-            if invalid_rows:
-                error_msg = f'发现{len(invalid_rows)}个无效行: ' + '; '.join(invalid_rows[:5])
-                if len(invalid_rows) > 5:
-                    error_msg += f'... (还有{len(invalid_rows)-5}个)'
-                self.results.append(('ERROR', '数据格式错误', error_msg))
+            if invalid_count:
+                error_msg = f'发现{invalid_count}个无效行: ' + '; '.join(invalid_rows)
+                if invalid_count > 5:
+                    error_msg += f'... (还有{invalid_count-5}个)'
+                self._add('ERROR', '数据格式错误', error_msg)
             
             if duplicate_words:
                 dup_msg = f'发现{len(duplicate_words)}个重复单词: ' + ', '.join(list(duplicate_words)[:5])
                 if len(duplicate_words) > 5:
                     dup_msg += f'... (还有{len(duplicate_words)-5}个)'
-                self.results.append(('WARNING', '重复数据', dup_msg))
+                self._add('WARNING', '重复数据', dup_msg)
             
             if valid_words > 0:
-                self.results.append(('OK', '数据完整性检查', f'有效单词: {valid_words}/{total_words}'))
+                self._add('OK', '数据完整性检查', f'有效单词: {valid_words}/{total_words}')
             
-            return len(invalid_rows) == 0
+            return invalid_count == 0
             
         except Exception as e:
-            self.results.append(('ERROR', '数据完整性检查失败', str(e)))
+            self._add('ERROR', '数据完整性检查失败', str(e))
             return False
     
+    def _validate_rows(self, csv_handler):
+        """逐行校验CSV"""
+        tally = _IntegrityTally()
+        
+        for i, row in enumerate(csv_handler.iter_words()):
+            tally.total += 1
+            
+            # 检查重复（只统计列数足够且单词、释义非空的行）
+            if len(row) >= 5 and row[0] and row[1]:
+                tally.track_word(row[0])
+            
+            if _row_is_clean(row):
+                tally.valid += 1
+                continue
+            
+            problem = _row_problem(i, row)
+            if problem:
+                tally.add_invalid(problem)
+            else:
+                tally.valid += 1
+        
+        return tally
+    
+    def _validate_rows_numpy(self, csv_handler):
+        """
+        分块向量化校验CSV：格式规范的行（纯数字复习次数、补零的合法日期）用NumPy批量判定，
+        其余少数行再逐行确认，结果与逐行校验完全一致
+        """
+        import numpy as np
+        
+        tally = _IntegrityTally()
+        chunk = []
+        
+        def flush():
+            n = len(chunk)
+            cols = WordColumns(chunk)
+            if (cols.lengths > 5).any():
+                # 与逐行校验中解包多余列时的错误保持一致
+                raise ValueError('too many values to unpack (expected 5)')
+            
+            checked = (cols.complete
+                       & np.fromiter(map(bool, cols.words), dtype=bool, count=n)
+                       & np.fromiter(map(bool, cols.definitions), dtype=bool, count=n))
+            tally.track_words([cols.words[i] for i in np.flatnonzero(checked)])
+            
+            clean = checked & cols.added_ok & cols.last_ok & cols.count_ok
+            
+            offset = tally.total
+            for idx in np.flatnonzero(~clean):
+                problem = _row_problem(offset + idx, chunk[idx])
+                if problem:
+                    tally.add_invalid(problem)
+                else:
+                    tally.valid += 1
+            tally.valid += int(clean.sum())
+            tally.total += n
+            chunk.clear()
+        
+        for row in csv_handler.iter_words():
+            chunk.append(row)
+            if len(chunk) >= _VALIDATE_CHUNK_ROWS:
+                flush()
+        if chunk:
+            flush()
+        
+        return tally
+    
     def check_network_connectivity(self):
         """检查网络连接性"""
         print("🔍 检查网络连接...")
         
+        import requests
+        
         try:
             timeout = self.config['ntfy_timeout_seconds']
             
@@ -179,24 +379,60 @@ class HealthChecker:
             test_url = f"https://ntfy.sh/{self.ntfy_topic}"
             
             start_time = time.time()
-            response = requests.head(test_url, timeout=timeout)
+            response = _get_session().head(test_url, timeout=timeout)
             response_time = int((time.time() - start_time) * 1000)
             
             if response.status_code == 200:
-                self.results.append(('OK', 'ntfy.sh连接正常', f'响应时间: {response_time}ms'))
+                self._add('OK', 'ntfy.sh连接正常', f'响应时间: {response_time}ms')
                 return True
             else:
-                self.results.append(('WARNING', 'ntfy.sh响应异常', f'状态码: {response.status_code}'))
+                self._add('WARNING', 'ntfy.sh响应异常', f'状态码: {response.status_code}')
                 return False
                 
         except requests.exceptions.Timeout:
-            self.results.append(('ERROR', '网络超时', f'ntfy.sh响应超时(>{timeout}s)'))
+            self._add('ERROR', '网络超时', f'ntfy.sh响应超时(>{timeout}s)')
             return False
         except requests.exceptions.ConnectionError:
-            self.results.append(('ERROR', '网络连接失败', '无法连接到ntfy.sh'))
+            self._add('ERROR', '网络连接失败', '无法连接到ntfy.sh')
             return False
         except Exception as e:
-            self.results.append(('ERROR', '网络检查失败', str(e)))
+            self._add('ERROR', '网络检查失败', str(e))
+            return False
+    
+    async def _check_network_connectivity_async(self):
+        """用aiohttp异步检查网络连接（未安装aiohttp时放到线程中执行同步版本）"""
+        try:
+            import aiohttp
+        except ImportError:
+            return await asyncio.to_thread(self.check_network_connectivity)
+        
+        print("🔍 检查网络连接...")
+        
+        timeout = self.config['ntfy_timeout_seconds']
+        try:
+            test_url = f"https://ntfy.sh/{self.ntfy_topic}"
+            
+            start_time = time.time()
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+                async with session.head(test_url) as response:
+                    status_code = response.status
+            response_time = int((time.time() - start_time) * 1000)
+            
+            if status_code == 200:
+                self._add('OK', 'ntfy.sh连接正常', f'响应时间: {response_time}ms')
+                return True
+            else:
+                self._add('WARNING', 'ntfy.sh响应异常', f'状态码: {status_code}')
+                return False
+                
+        except asyncio.TimeoutError:
+            self._add('ERROR', '网络超时', f'ntfy.sh响应超时(>{timeout}s)')
+            return False
+        except aiohttp.ClientConnectionError:
+            self._add('ERROR', '网络连接失败', '无法连接到ntfy.sh')
+            return False
+        except Exception as e:
+            self._add('ERROR', '网络检查失败', str(e))
             return False
     
     def check_system_resources(self):
@@ -209,23 +445,27 @@ class HealthChecker:
             # 检查内存使用
             memory = psutil.virtual_memory()
             if memory.percent > 90:
-                self.results.append(('ERROR', '内存使用过高', f'内存使用率: {memory.percent:.1f}%'))
+                self._add('ERROR', '内存使用过高', f'内存使用率: {memory.percent:.1f}%')
             elif memory.percent > 80:
-                self.results.append(('WARNING', '内存使用较高', f'内存使用率: {memory.percent:.1f}%'))
+                self._add('WARNING', '内存使用较高', f'内存使用率: {memory.percent:.1f}%')
             else:
-                self.results.append(('OK', '内存使用正常', f'内存使用率: {memory.percent:.1f}%'))
+                self._add('OK', '内存使用正常', f'内存使用率: {memory.percent:.1f}%')
             
-            # 检查CPU使用（1秒采样）
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # 检查CPU使用（从初始化时的预热采样算起，不足0.1秒时补足）
+            remaining = CPU_MIN_SAMPLE_SECONDS - (time.monotonic() - self._cpu_sampled_at)
+            if remaining > 0:
+                time.sleep(remaining)
+            cpu_percent = psutil.cpu_percent(interval=None)
+            self._cpu_sampled_at = time.monotonic()
             if cpu_percent > 90:
-                self.results.append(('WARNING', 'CPU使用过高', f'CPU使用率: {cpu_percent:.1f}%'))
+                self._add('WARNING', 'CPU使用过高', f'CPU使用率: {cpu_percent:.1f}%')
             else:
-                self.results.append(('OK', 'CPU使用正常', f'CPU使用率: {cpu_percent:.1f}%'))
+                self._add('OK', 'CPU使用正常', f'CPU使用率: {cpu_percent:.1f}%')
                 
         except ImportError:
-            self.results.append(('INFO', '系统资源监控', '需要安装psutil包以监控系统资源'))
+            self._add('INFO', '系统资源监控', '需要安装psutil包以监控系统资源')
         except Exception as e:
-            self.results.append(('WARNING', '系统资源检查失败', str(e)))
+            self._add('WARNING', '系统资源检查失败', str(e))
     
     def check_service_status(self):
         """检查服务状态（如果在systemd环境下）"""
@@ -233,17 +473,38 @@ class HealthChecker:
         
         try:
             # 检查systemd服务状态
-            result = os.popen('systemctl is-active gre_app.service 2>/dev/null').read().strip()
+            result = self._systemd_active_state('gre_app.service')
             
             if result == 'active':
-                self.results.append(('OK', 'Web服务状态', 'gre_app.service 运行正常'))
+                self._add('OK', 'Web服务状态', 'gre_app.service 运行正常')
             elif result == 'inactive':
-                self.results.append(('ERROR', 'Web服务停止', 'gre_app.service 未运行'))
+                self._add('ERROR', 'Web服务停止', 'gre_app.service 未运行')
             else:
-                self.results.append(('WARNING', 'Web服务状态未知', f'gre_app.service 状态: {result}'))
+                self._add('WARNING', 'Web服务状态未知', f'gre_app.service 状态: {result}')
                 
         except Exception as e:
-            self.results.append(('INFO', '服务状态检查', '无法检查systemd服务状态'))
+            self._add('INFO', '服务状态检查', '无法检查systemd服务状态')
+    
+    def _systemd_active_state(self, unit_name):
+        """
+        查询systemd单元的ActiveState
+        优先通过D-Bus读取（需要pydbus，不创建子进程），否则直接执行systemctl（不经过shell）
+        """
+        try:
+            import pydbus
+            bus = pydbus.SystemBus()
+            manager = bus.get('.systemd1')
+            return str(bus.get('.systemd1', manager.LoadUnit(unit_name)).ActiveState)
+        except Exception:
+            pass
+        
+        import subprocess
+        try:
+            result = subprocess.run(['systemctl', 'is-active', unit_name],
+                                    capture_output=True, text=True, timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            return ''
+        return result.stdout.strip()
     
     def run_full_check(self):
         """运行完整的健康检查"""
@@ -251,45 +512,56 @@ class HealthChecker:
         print("=" * 60)
         
         self.results = []
-        
-        # 执行各项检查
-        checks = [
-            self.check_file_system,
-            self.check_data_integrity,
-            self.check_network_connectivity,
-            self.check_system_resources,
-            self.check_service_status
-        ]
-        
-        for check in checks:
-            try:
-                check()
-            except Exception as e:
-                self.results.append(('ERROR', f'{check.__name__}失败', str(e)))
+        self._csv_stat_result = None
+        asyncio.run(self._run_full_check_async())
         
         # 生成报告
         self.print_report()
         return self.get_overall_status()
     
+    async def _run_check(self, name, func):
+        """在独立的结果列表中运行单项检查，异常记为错误"""
+        bucket = []
+        _current_results.set(bucket)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                await func()
+            else:
+                await asyncio.to_thread(func)
+        except Exception as e:
+            bucket.append(('ERROR', f'{name}失败', str(e)))
+        return bucket
+    
+    async def _run_full_check_async(self):
+        """并发执行各项检查，总耗时取决于最慢的一项"""
+        checks = [
+            ('check_file_system', self.check_file_system),
+            ('check_data_integrity', self.check_data_integrity),
+            ('check_network_connectivity', self._check_network_connectivity_async),
+            ('check_system_resources', self.check_system_resources),
+            ('check_service_status', self.check_service_status)
+        ]
+        
+        buckets = await asyncio.gather(*(self._run_check(name, func) for name, func in checks))
+        for bucket in buckets:
+            self.results.extend(bucket)
+    
+    def _status_counts(self):
+        """各状态的结果数量（单次遍历，结果列表不变时复用）"""
+        if self._counts is None or self._counts[0] != len(self.results):
+            self._counts = (len(self.results), Counter(status for status, _, _ in self.results))
+        return self._counts[1]
+    
     def print_report(self):
         """打印检查报告"""
         print("\n📋 健康检查报告")
         print("=" * 60)
         
-        status_counts = {'OK': 0, 'WARNING': 0, 'ERROR': 0, 'INFO': 0}
-        
         for status, title, message in self.results:
-            status_counts[status] += 1
-            
-            icon = {
-                'OK': '✅',
-                'WARNING': '⚠️',
-                'ERROR': '❌',
-                'INFO': 'ℹ️'
-            }.get(status, '❓')
-            
+            icon = _STATUS_ICONS.get(status, '❓')
             print(f"{icon} [{status}] {title}: {message}")
         
+        status_counts = self._status_counts()
         print("\n📊 检查总结")
         print(f"✅ 正常: {status_counts['OK']}")
         print(f"⚠️ 警告: {status_counts['WARNING']}")
@@ -301,8 +573,9 @@ class HealthChecker:
     
     def get_overall_status(self):
         """获取整体健康状态"""
-        error_count = sum(1 for status, _, _ in self.results if status == 'ERROR')
-        warning_count = sum(1 for status, _, _ in self.results if status == 'WARNING')
+        status_counts = self._status_counts()
+        error_count = status_counts['ERROR']
+        warning_count = status_counts['WARNING']
         
         if error_count > 0:
             return f"❌ 异常 ({error_count}个错误)"
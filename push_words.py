@@ -5,15 +5,22 @@ GRE单词推送脚本 - 基于艾宾浩斯记忆曲线
 修复版：解决并发问题，增强错误处理
 """
 
-import csv
-import requests
-import random
+import asyncio
+import heapq
+import ipaddress
+import os
+import socket
+import tempfile
+import threading
 import time
-from datetime import date, timedelta, datetime
-from safe_csv import get_csv_handler
+from datetime import date, datetime
+from functools import lru_cache
+from operator import itemgetter
+from urllib.parse import urlsplit
+from safe_csv import get_csv_handler, WordColumns
 
 # --- 配置区 ---
-NTFY_TOPIC = "gre-words-for-my-awesome-life-123xyz"  # 换成你的 ntfy 主题
+NTFY_TOPIC = "gre-words-for-my-awesome-life-123xyz"  # 换成你的 ntfy 主题（多个订阅者用逗号分隔）
 CSV_FILE_PATH = "/home/your_user/gre_word_pusher/words.csv"
 WORDS_PER_PUSH = 15
 
@@ -21,6 +28,220 @@ WORDS_PER_PUSH = 15
 # 分别是：新词(0), 复习1次后, 复习2次后, ...
 # 第0阶段(新词)实际上是立即复习，这里用1天作为首次复习间隔
 REVIEW_INTERVALS = [1, 2, 4, 7, 15, 30, 60]
+# 按复习次数直接索引的间隔表，超出预设阶段的次数使用最后一个间隔（逐行计算时省去min/len调用）
+_INTERVALS_EXTENDED = tuple(REVIEW_INTERVALS) + (REVIEW_INTERVALS[-1],) * (256 - len(REVIEW_INTERVALS))
+
+NTFY_HOST = "ntfy.sh"
+# ntfy.sh 解析结果的磁盘缓存，避免每次cron运行都做一次DNS查询
+# 与单词文件、失败日志放在同一目录（不放在所有用户都可写的/tmp，防止被他人预先写入其他地址）
+NTFY_ADDR_CACHE = os.path.join(os.path.dirname(CSV_FILE_PATH), "ntfy_ip.cache")
+NTFY_ADDR_TTL = 3600  # 秒
+# 推送到多个主题时同时进行的请求数上限（与requests连接池默认大小一致，也避免触发ntfy限流）
+MAX_CONCURRENT_PUSHES = 10
+
+
+# requests 只在真正发送推送时才导入，没有待复习单词的cron运行不必付出导入开销
+_SESSION = None
+# 多个主题在线程池中同时推送，延迟初始化的全局对象需要加锁，避免重复创建
+_INIT_LOCK = threading.Lock()
+
+
+def _get_session():
+    """复用同一个连接，重试时不必重新进行TCP+TLS握手"""
+    global _SESSION
+    if _SESSION is not None:
+        return _SESSION
+    with _INIT_LOCK:
+        if _SESSION is not None:
+            return _SESSION
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        class _PinnedHostAdapter(HTTPAdapter):
+            """直接连接缓存的IP，TLS的SNI和证书校验仍使用原主机名"""
+            
+            def __init__(self, hostname, **kwargs):
+                self.hostname = hostname
+                super().__init__(**kwargs)
+            
+            def init_poolmanager(self, *args, **kwargs):
+                kwargs['server_hostname'] = self.hostname
+                kwargs['assert_hostname'] = self.hostname
+                super().init_poolmanager(*args, **kwargs)
+            
+            def send(self, request, **kwargs):
+                """依次尝试缓存的各个地址；全部连接失败时丢弃缓存并抛出最后一个错误"""
+                addresses = _ntfy_addresses()
+                if not addresses:
+                    return super().send(request, **kwargs)
+                
+                parts = urlsplit(request.url)
+                port = f":{parts.port}" if parts.port else ""
+                request.headers['Host'] = self.hostname
+                for i, address in enumerate(addresses):
+                    host = f"[{address}]" if ':' in address else address  # IPv6
+                    request.url = parts._replace(netloc=host + port).geturl()
+                    try:
+                        return super().send(request, **kwargs)
+                    except requests.exceptions.ConnectionError:
+                        if i == len(addresses) - 1:
+                            _forget_ntfy_address()
+                            raise
+        
+        session = requests.Session()
+        session.mount(f"https://{NTFY_HOST}/", _PinnedHostAdapter(NTFY_HOST))
+        _SESSION = session
+    return _SESSION
+
+
+def _ntfy_addresses():
+    """
+    返回 ntfy.sh 的全部IP地址（IPv4在前，磁盘缓存NTFY_ADDR_TTL秒），解析失败时返回空列表
+    """
+    try:
+        if time.time() - os.stat(NTFY_ADDR_CACHE).st_mtime < NTFY_ADDR_TTL:
+            with open(NTFY_ADDR_CACHE, 'r', encoding='utf-8') as f:
+                addresses = f.read().split()
+            # 只接受合法的IP地址，文件内容异常时重新解析
+            for address in addresses:
+                ipaddress.ip_address(address)
+            if addresses:
+                return addresses
+    except (OSError, ValueError):
+        pass
+    
+    try:
+        infos = socket.getaddrinfo(NTFY_HOST, 443, type=socket.SOCK_STREAM)
+    except OSError:
+        return []
+    # 没有IPv6路由的主机上IPv6地址会连接失败，优先尝试IPv4
+    infos.sort(key=lambda info: info[0] != socket.AF_INET)
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    
+    try:
+        # 临时文件名由mkstemp生成，多个线程同时写入缓存时互不覆盖
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(NTFY_ADDR_CACHE) or '.',
+                                        prefix='ntfy_ip.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write("\n".join(addresses))
+            os.replace(tmp_path, NTFY_ADDR_CACHE)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+    return addresses
+
+
+def _forget_ntfy_address():
+    """所有地址都连接失败时丢弃缓存，下次重新解析"""
+    try:
+        os.remove(NTFY_ADDR_CACHE)
+    except OSError:
+        pass
+
+
+# 单词数超过该值时用NumPy向量化挑选到期单词（未安装NumPy则逐行计算）
+_NUMPY_MIN_ROWS = 5000
+
+
+@lru_cache(maxsize=4096)
+def _date_ordinal(value):
+    """解析 YYYY-MM-DD 日期为序数天（同一日期只解析一次）"""
+    return datetime.strptime(value, '%Y-%m-%d').date().toordinal()
+
+
+def _due_entry(i, row, today_ordinal):
+    """
+    计算单行是否需要复习，返回 (row, days_overdue, i)
+    不需要复习或格式错误（打印警告）时返回None
+    """
+    try:
+        if len(row) < 5:
+            print(f"警告: 跳过格式不完整的行 {i+1}: {row}")
+            return None
+            
+        word, definition, added_date, last_reviewed_date, review_count_str = row
+        review_count = int(review_count_str)
+        
+        # 优先处理新词 
+        if review_count == 0:
+            return (row, -999, i)  # 用-999保证新词排序最前
+
+        # 计算下一次复习日期
+        try:
+            last_review_day = _date_ordinal(last_reviewed_date)
+        except ValueError:
+            print(f"警告: 跳过日期格式错误的行 {i+1}: {row}")
+            return None
+            
+        # 获取当前阶段对应的间隔天数，如果超出预设则使用最后一个间隔
+        if 0 < review_count < 256:
+            interval_days = _INTERVALS_EXTENDED[review_count]
+        else:
+            interval_days = REVIEW_INTERVALS[min(review_count, len(REVIEW_INTERVALS) - 1)]
+        next_review_day = last_review_day + interval_days
+
+        if today_ordinal >= next_review_day:
+            days_overdue = today_ordinal - next_review_day
+            return (row, days_overdue, i)  # 记录原始索引
+            
+    except (ValueError, IndexError) as e:
+        print(f"警告: 跳过格式错误的行 {i+1}: {row}. 错误: {e}")
+    return None
+
+
+def _iter_due(all_words, today):
+    """逐行产出需要复习的单词 (row, days_overdue, i)"""
+    today_ordinal = today.toordinal()
+    for i, row in enumerate(all_words):
+        entry = _due_entry(i, row, today_ordinal)
+        if entry is not None:
+            yield entry
+
+
+def _select_due_words_python(all_words, today, num_words):
+    """逐行筛选到期单词，按逾期天数取前num_words个"""
+    # 排序：最逾期的 > 新词 > 刚到期的（堆选择只保留num_words个候选）
+    return heapq.nlargest(num_words, _iter_due(all_words, today), key=itemgetter(1))
+
+
+def _select_due_words_numpy(all_words, today, num_words):
+    """
+    用NumPy整数运算筛选到期单词：格式规范的行（纯数字复习次数、补零的合法日期）批量计算，
+    其余少数行逐行处理（打印同样的警告），排序结果与逐行计算一致
+    """
+    import numpy as np
+    
+    cols = WordColumns(all_words)
+    review_count = cols.review_count
+    
+    fast = cols.complete & cols.count_ok & ((review_count == 0) | cols.last_ok)
+    intervals = np.array(REVIEW_INTERVALS, dtype=np.int64)
+    next_day = cols.last_day + intervals[np.minimum(review_count, len(REVIEW_INTERVALS) - 1)]
+    overdue = np.datetime64(today, 'D').astype(np.int64) - next_day
+    due = fast & ((review_count == 0) | (overdue >= 0))
+    keys = np.where(review_count == 0, -999, overdue)
+    
+    # 格式不规范的行逐行处理
+    slow_idx, slow_keys = [], []
+    for i in np.flatnonzero(~fast):
+        entry = _due_entry(int(i), all_words[i], today.toordinal())
+        if entry is not None:
+            slow_idx.append(entry[2])
+            slow_keys.append(entry[1])
+    
+    # 排序：最逾期的 > 新词 > 刚到期的（相同逾期天数保持原始顺序）
+    idx = np.concatenate([np.flatnonzero(due), np.array(slow_idx, dtype=np.int64)])
+    keys = np.concatenate([keys[due], np.array(slow_keys, dtype=np.int64)])
+    if 0 < num_words < len(keys):
+        # 先用O(n)的partition找出第num_words大的逾期天数，只对不小于它的候选排序（含并列的行）
+        threshold = np.partition(keys, len(keys) - num_words)[len(keys) - num_words]
+        candidates = keys >= threshold
+        idx, keys = idx[candidates], keys[candidates]
+    order = np.lexsort((idx, -keys))[:num_words]
+    return [(all_words[i], int(k), int(i)) for i, k in zip(idx[order], keys[order])]
 
 
 def get_review_words(file_path, num_words):
@@ -37,47 +258,18 @@ def get_review_words(file_path, num_words):
         return [], [], set()
 
     today = date.today()
-    due_words = []
     
-    # 1. 筛选出所有新词和到期的词
-    for i, row in enumerate(all_words):
+    # 1. 筛选出所有新词和到期的词，按优先级取前num_words个
+    words_to_review_with_indices = None
+    if len(all_words) >= _NUMPY_MIN_ROWS:
         try:
-            if len(row) < 5:
-                print(f"警告: 跳过格式不完整的行 {i+1}: {row}")
-                continue
-                
-            word, definition, added_date, last_reviewed_date, review_count_str = row
-            review_count = int(review_count_str)
-            
-            # 优先处理新词 
-            if review_count == 0:
-                due_words.append((row, -999, i))  # 用-999保证新词排序最前
-                continue
-
-            # 计算下一次复习日期
-            try:
-                last_review_dt = datetime.strptime(last_reviewed_date, '%Y-%m-%d').date()
-            except ValueError:
-                print(f"警告: 跳过日期格式错误的行 {i+1}: {row}")
-                continue
-                
-            # 获取当前阶段对应的间隔天数，如果超出预设则使用最后一个间隔
-            interval_days = REVIEW_INTERVALS[min(review_count, len(REVIEW_INTERVALS) - 1)]
-            next_review_date = last_review_dt + timedelta(days=interval_days)
-
-            if today >= next_review_date:
-                days_overdue = (today - next_review_date).days
-                due_words.append((row, days_overdue, i))  # 记录原始索引
-                
-        except (ValueError, IndexError) as e:
-            print(f"警告: 跳过格式错误的行 {i+1}: {row}. 错误: {e}")
-            continue
-
-    # 2. 排序：最逾期的 > 新词 > 刚到期的
-    due_words.sort(key=lambda x: x[1], reverse=True)
+            words_to_review_with_indices = _select_due_words_numpy(all_words, today, num_words)
+        except ImportError:
+            pass
+    if words_to_review_with_indices is None:
+        words_to_review_with_indices = _select_due_words_python(all_words, today, num_words)
     
-    # 3. 提取要复习的单词列表和它们的原始索引
-    words_to_review_with_indices = due_words[:num_words]
+    # 2. 提取要复习的单词列表和它们的原始索引
     words_to_review = [item[0] for item in words_to_review_with_indices]
     original_indices = {item[2] for item in words_to_review_with_indices}
 
@@ -87,24 +279,25 @@ def get_review_words(file_path, num_words):
 def update_and_save_words(file_path, all_words, reviewed_indices):
     """
     更新复习过的单词的状态并安全写回文件
-    使用备份机制防止数据损坏
+    只向复习状态日志追加这几行的更新，不重写整个CSV（日志定期合并）
     """
     if not reviewed_indices:
         return
         
     today_str = date.today().isoformat()
-    updated_count = 0
+    updates = []
     
-    for i, row in enumerate(all_words):
-        if i in reviewed_indices and len(row) >= 5:
+    for i in reviewed_indices:
+        row = all_words[i]
+        if len(row) >= 5:
             row[3] = today_str  # 更新上次复习日期
             row[4] = str(int(row[4]) + 1)  # 记忆阶段+1
-            updated_count += 1
+            updates.append((row[0], row[3], row[4]))
     
     csv_handler = get_csv_handler(file_path)
     try:
-        csv_handler.write_all_words(all_words, create_backup=True)
-        print(f"成功更新 {updated_count} 个单词的复习状态")
+        csv_handler.append_review_updates(updates)
+        print(f"成功更新 {len(updates)} 个单词的复习状态")
     except Exception as e:
         print(f"更新单词状态失败: {e}")
 
@@ -127,13 +320,17 @@ def send_notification_with_retry(topic, words_to_review, max_retries=3):
         print("没有有效的单词数据")
         return False
         
-    message = "\n".join(message_lines)
+    # 消息只编码一次，重试时直接复用同一份字节
+    payload = "\n".join(message_lines).encode('utf-8')
+    
+    import requests
+    session = _get_session()
     
     for attempt in range(max_retries):
         try:
-            response = requests.post(
+            response = session.post(
                 f"https://ntfy.sh/{topic}",
-                data=message.encode('utf-8'),
+                data=payload,
                 headers={
                     "Title": f"GRE 单词复习！({len(words_to_review)}词)",
                     "Priority": "high",
@@ -165,20 +362,79 @@ def send_notification_with_retry(topic, words_to_review, max_retries=3):
     return False
 
 
+def push_and_update(file_path, topic, words_to_review, all_words, reviewed_indices):
+    """
+    推送通知，至少一个主题推送成功后才写回复习状态
+    topic 可以是逗号分隔的多个主题，各主题并发推送
+    """
+    topics = [t.strip() for t in topic.split(',') if t.strip()]
+    
+    async def push_all():
+        limit = asyncio.Semaphore(MAX_CONCURRENT_PUSHES)
+        
+        async def push_one(t):
+            async with limit:
+                return await asyncio.to_thread(send_notification_with_retry, t, words_to_review)
+        
+        return any(await asyncio.gather(*(push_one(t) for t in topics)))
+    
+    success = asyncio.run(push_all())
+    
+    if success:
+        update_and_save_words(file_path, all_words, reviewed_indices)
+    else:
+        print("由于推送失败，未更新单词状态")
+    
+    return success
+
+
+# 推送失败日志超过该大小时轮转，保留FAILED_LOG_BACKUPS个旧文件
+FAILED_LOG_MAX_BYTES = 1024 * 1024
+FAILED_LOG_BACKUPS = 3
+
+_failed_logger = None
+
+
+def _get_failed_logger():
+    """推送失败日志（首次失败时按当前CSV_FILE_PATH打开，之后复用同一个文件句柄）"""
+    global _failed_logger
+    if _failed_logger is not None:
+        return _failed_logger
+    with _INIT_LOCK:
+        if _failed_logger is not None:
+            return _failed_logger
+        import logging
+        from logging.handlers import RotatingFileHandler
+        
+        handler = RotatingFileHandler(
+            CSV_FILE_PATH.replace('.csv', '_failed_notifications.log'),
+            maxBytes=FAILED_LOG_MAX_BYTES,
+            backupCount=FAILED_LOG_BACKUPS,
+            encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger = logging.getLogger('gre.failed_notifications')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _failed_logger = logger
+    return _failed_logger
+
+
 def log_failed_notification(words_to_review):
     """记录推送失败的单词，供后续重试"""
     try:
         timestamp = datetime.now().isoformat()
-        failed_log_path = CSV_FILE_PATH.replace('.csv', '_failed_notifications.log')
+        lines = [f"\n--- {timestamp} ---"]
+        for word_data in words_to_review:
+            if len(word_data) >= 2:
+                lines.append(f"{word_data[0]}: {word_data[1]}")
+        lines.append("--- End ---")
         
-        with open(failed_log_path, 'a', encoding='utf-8') as f:
-            f.write(f"\n--- {timestamp} ---\n")
-            for word_data in words_to_review:
-                if len(word_data) >= 2:
-                    f.write(f"{word_data[0]}: {word_data[1]}\n")
-            f.write("--- End ---\n")
+        logger = _get_failed_logger()
+        logger.info("\n".join(lines))
         
-        print(f"失败的推送已记录到: {failed_log_path}")
+        print(f"失败的推送已记录到: {logger.handlers[0].baseFilename}")
     except Exception as e:
         print(f"记录失败日志时出错: {e}")
 
@@ -191,12 +447,7 @@ if __name__ == "__main__":
         
         if review_list:
             print(f"找到 {len(review_list)} 个需要复习的单词")
-            success = send_notification_with_retry(NTFY_TOPIC, review_list)
-            
-            if success:
-                update_and_save_words(CSV_FILE_PATH, all_data, reviewed_idx)
-            else:
-                print("由于推送失败，未更新单词状态")
+            push_and_update(CSV_FILE_PATH, NTFY_TOPIC, review_list, all_data, reviewed_idx)
         else:
             print("今天没有需要复习的单词")
             
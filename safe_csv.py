@@ -7,10 +7,42 @@
 
 import csv
 import fcntl
+import io
+import json
+import mmap
 import os
+import sqlite3
+import tempfile
+import threading
 import time
 from contextlib import contextmanager
-from typing import List, Optional, Tuple, Set
+from datetime import date, timedelta
+from functools import cached_property
+from typing import Dict, Iterator, List, Optional, Tuple, Set
+
+
+# 复习状态日志中最早的记录超过该天数时合并进CSV
+JOURNAL_COMPACT_DAYS = 7
+
+
+def _render_csv(rows: List[List[str]]) -> str:
+    """
+    把多行数据序列化为CSV文本，结果与csv.writer完全相同
+    没有任何字段需要加引号时直接用','.join拼接（快数倍），否则交给csv.writer
+    """
+    try:
+        data = ''.join([','.join(row) + '\r\n' for row in rows])
+    except TypeError:
+        data = None  # 含非字符串字段
+    # 逗号、换行数量与行列结构吻合且没有引号，说明没有字段含特殊字符；单个空字段的行csv.writer会写成""
+    if (data is not None and '"' not in data
+            and data.count(',') == sum(map(len, rows)) - sum(1 for row in rows if row)
+            and data.count('\n') == len(rows) and data.count('\r') == len(rows)
+            and [''] not in rows):
+        return data
+    buf = io.StringIO(newline='')
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
 
 
 class SafeCSVHandler:
@@ -19,61 +51,243 @@ class SafeCSVHandler:
     def __init__(self, file_path: str):
         self.file_path = file_path
         self.backup_path = f"{file_path}.backup"
+        # 小写单词集合：((mtime_ns, size), set)，文件被其他进程修改后按stat失效重建
+        self._word_set = None
+        # 单词集合的持久化副本（JSON），进程重启后CSV的 (mtime_ns, size) 未变化时直接加载
+        self.keys_path = f"{file_path}.keys.json"
+        # 复习状态日志：每行一个JSON数组 [单词, 上次复习日期, 复习次数]，读取时覆盖到同一单词的行上
+        self.journal_path = f"{file_path}.journal"
+        # 文件已确认存在：每个实例只检查一次，之后打开时发现文件被删除再重新检查
+        self._ensured = False
         
     def _ensure_file_exists(self):
-        """确保CSV文件存在，不存在则创建"""
-        if not os.path.exists(self.file_path):
-            with open(self.file_path, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                # 写入CSV头部（可选）
-                # writer.writerow(['word', 'definition', 'added_date', 'last_reviewed_date', 'review_count'])
+        """
+        确保CSV文件存在，不存在则创建
+        O_CREAT|O_EXCL在一次系统调用内完成检查和创建，也不会清空其他进程刚刚创建的文件
+        """
+        if self._ensured:
+            return
+        try:
+            # 新文件为空，不写CSV头部
+            os.close(os.open(self.file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        except FileExistsError:
+            pass
+        self._ensured = True
     
     @contextmanager
-    def _safe_file_lock(self, mode='r'):
-        """安全的文件锁上下文管理器"""
+    def _safe_file_lock(self, mode='r', shared=None):
+        """安全的文件锁上下文管理器（只读打开默认加共享锁，多个读者可以同时读取；写入和追加互斥）"""
+        if shared is None:
+            shared = 'r' in mode and '+' not in mode
+        lock_type = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
         max_retries = 3
         retry_delay = 0.1
         
         for attempt in range(max_retries):
+            f = None
             try:
+                if not self._ensured:
+                    self._ensure_file_exists()
                 f = open(self.file_path, mode, encoding='utf-8', newline='')
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                yield f
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                f.close()
-                return
+                fcntl.flock(f.fileno(), lock_type | fcntl.LOCK_NB)
+                while os.fstat(f.fileno()).st_ino != os.stat(self.file_path).st_ino:
+                    # 等待期间文件被整体替换（合并复习状态日志），锁住的是旧文件，重新打开新文件加锁
+                    f.close()
+                    f = open(self.file_path, mode, encoding='utf-8', newline='')
+                    fcntl.flock(f.fileno(), lock_type | fcntl.LOCK_NB)
+                break
             except (IOError, OSError) as e:
                 if f:
                     f.close()
+                if isinstance(e, FileNotFoundError):
+                    self._ensured = False  # 文件在检查之后被删除，重试前重新创建
                 if attempt < max_retries - 1:
                     print(f"文件锁获取失败，重试 {attempt + 1}/{max_retries}")
                     time.sleep(retry_delay * (2 ** attempt))  # 指数退避
                 else:
                     raise Exception(f"无法获取文件锁，最大重试次数已达到: {e}")
+        
+        # 只重试获取锁；with块内抛出的异常直接向外传播
+        try:
+            yield f
+        finally:
+            f.close()  # 先刷新缓冲再关闭文件，关闭时释放锁
     
     def read_all_words(self) -> List[List[str]]:
-        """安全读取所有单词"""
+        """安全读取所有单词（已合并复习状态日志）"""
         self._ensure_file_exists()
         
         try:
             with self._safe_file_lock('r') as f:
-                return list(csv.reader(f))
+                # 整个文件一次解码进内存再解析，避免csv.reader按8KB块反复读
+                data = self._read_mapped(f)
+                updates = self.read_journal()
+            rows = list(csv.reader(io.StringIO(data, newline='')))
+            self._apply_journal(rows, updates)
+            return rows
         except Exception as e:
             print(f"读取CSV文件失败: {e}")
             return []
     
+    @staticmethod
+    def _read_mapped(f) -> str:
+        """把已加锁的文件整体解码为字符串：直接从mmap映射的页缓存解码，省去read()的中间缓冲"""
+        if os.fstat(f.fileno()).st_size == 0:
+            return ''  # 空文件无法mmap
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return str(m, 'utf-8')
+    
+    def iter_words(self) -> Iterator[List[str]]:
+        """
+        逐行解析单词，不生成完整的行列表（已合并复习状态日志）
+        只在读取文件内容时持有锁，释放锁后再逐行解析；读取失败时抛出异常，由调用方处理
+        """
+        self._ensure_file_exists()
+        
+        with self._safe_file_lock('r') as f:
+            data = self._read_mapped(f)
+            updates = self.read_journal()
+        for row in csv.reader(io.StringIO(data, newline='')):
+            if updates and len(row) >= 5 and row[0] in updates:
+                row[3], row[4] = updates[row[0]]
+            yield row
+    
+    def read_columns(self) -> 'WordColumns':
+        """读取所有单词并按列返回（需要NumPy）"""
+        return WordColumns(self.read_all_words())
+    
+    def read_journal(self) -> Dict[str, Tuple[str, str]]:
+        """读取复习状态日志：{单词: (上次复习日期, 复习次数)}，同一单词以最后一条为准"""
+        updates = {}
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8', newline='') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break  # 未写完的最后一行
+                    try:
+                        word, last_reviewed_date, review_count = json.loads(line)
+                    except (ValueError, TypeError):
+                        continue
+                    updates[word] = (last_reviewed_date, review_count)
+        except FileNotFoundError:
+            pass
+        return updates
+    
+    @staticmethod
+    def _apply_journal(rows: List[List[str]], updates: Dict[str, Tuple[str, str]]):
+        if not updates:
+            return
+        for row in rows:
+            if len(row) >= 5 and row[0] in updates:
+                row[3], row[4] = updates[row[0]]
+    
+    def append_review_updates(self, updates: List[Tuple[str, str, str]]):
+        """
+        追加复习状态更新 (单词, 上次复习日期, 复习次数)，只写几十字节而不是重写整个CSV
+        日志中最早的记录超过JOURNAL_COMPACT_DAYS天时合并进CSV
+        """
+        if not updates:
+            return
+        
+        with self._safe_file_lock('a'):
+            with open(self.journal_path, 'a', encoding='utf-8', newline='') as j:
+                # 每条记录一行JSON，单词中的制表符、换行等都会被转义
+                j.write(''.join(json.dumps(list(update), ensure_ascii=False) + '\n'
+                                for update in updates))
+                j.flush()
+                os.fsync(j.fileno())
+        
+        if self._journal_due_for_compaction():
+            self.compact_journal()
+    
+    def _journal_due_for_compaction(self) -> bool:
+        """日志第一条记录的日期早于JOURNAL_COMPACT_DAYS天前时需要合并"""
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8', newline='') as j:
+                first = json.loads(j.readline())
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            return True
+        if not isinstance(first, list) or len(first) != 3:
+            return True
+        cutoff = (date.today() - timedelta(days=JOURNAL_COMPACT_DAYS)).isoformat()
+        return first[1] <= cutoff
+    
+    def compact_journal(self):
+        """
+        在同一把锁内把复习状态日志合并进CSV，然后删除日志
+        合并结果先写入同目录的临时文件并fsync，再用os.replace原子替换，中途失败不会留下写了一半的CSV
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        
+        with self._safe_file_lock('r+') as f:
+            self._backup_locked(f)
+            rows = list(csv.reader(io.StringIO(self._read_mapped(f), newline='')))
+            self._apply_journal(rows, self.read_journal())
+            
+            directory = os.path.dirname(os.path.abspath(self.file_path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            tmp = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+            try:
+                # 新文件在替换前就加锁：替换后打开它的进程要等日志删除之后才能拿到锁并追加日志
+                fcntl.flock(tmp.fileno(), fcntl.LOCK_EX)
+                tmp.write(_render_csv(rows))
+                tmp.flush()
+                os.fchmod(tmp.fileno(), os.fstat(f.fileno()).st_mode & 0o7777)
+                os.fsync(tmp.fileno())
+                os.replace(tmp_path, self.file_path)
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp_path)
+                raise
+            
+            try:
+                # 替换落盘之后才删除日志，否则断电后可能既没有新CSV也没有日志
+                dir_fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+                self._remove_journal()
+            finally:
+                tmp.close()
+    
+    def _remove_journal(self):
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+    
     def write_all_words(self, words_data: List[List[str]], create_backup: bool = True):
-        """安全写入所有单词数据"""
-        if create_backup and os.path.exists(self.file_path):
-            self._create_backup()
+        """安全写入所有单词数据（数据应已合并复习状态日志，写入后日志被清空）"""
+        backup = create_backup and os.path.exists(self.file_path)
+        self._ensure_file_exists()
+        
+        # 整个文件先在内存中生成，一次写入并fsync落盘之后才能删除日志
+        data = _render_csv(words_data)
         
+        backed_up = False
         try:
-            with self._safe_file_lock('w') as f:
-                writer = csv.writer(f)
-                writer.writerows(words_data)
+            # 用'r+'打开，拿到锁之后才截断（'w'模式会在加锁前就清空文件）；
+            # 备份与重写在同一把锁内完成，备份一定是被覆盖前的内容
+            with self._safe_file_lock('r+') as f:
+                if self._content_equals(f, data.encode('utf-8')):
+                    # 内容没有变化：不备份也不重写，只删除已合并进数据的日志
+                    self._remove_journal()
+                    return
+                if backup:
+                    backed_up = self._backup_locked(f)
+                f.seek(0)
+                f.write(data)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+                self._remove_journal()
         except Exception as e:
             print(f"写入CSV文件失败: {e}")
-            if create_backup:
+            if backed_up:
                 self._restore_backup()
             raise
     
@@ -81,35 +295,119 @@ class SafeCSVHandler:
         """安全追加单词"""
         try:
             with self._safe_file_lock('a') as f:
+                before = self._fstat_key(f)
                 writer = csv.writer(f)
                 writer.writerow(word_data)
+                f.flush()
+                self._track_appended(f, before, [word_data])
             return True
         except Exception as e:
             print(f"追加单词失败: {e}")
             return False
     
+    def append_words(self, words_data: List[List[str]], stats: Optional[list] = None) -> bool:
+        """
+        安全批量追加多个单词（一次加锁、一次fsync）
+        stats不为None时追加 (追加前, 追加后) 的 (mtime_ns, size)，两者都在同一把锁内取得
+        """
+        try:
+            with self._safe_file_lock('a') as f:
+                before = self._fstat_key(f)
+                writer = csv.writer(f)
+                writer.writerows(words_data)
+                f.flush()
+                os.fsync(f.fileno())
+                self._track_appended(f, before, words_data)
+                if stats is not None:
+                    stats.append((before, self._fstat_key(f)))
+            return True
+        except Exception as e:
+            print(f"批量追加单词失败: {e}")
+            return False
+    
     def word_exists(self, word: str) -> bool:
-        """检查单词是否存在（优化版本，避免全文件读取）"""
-        word_lower = word.lower()
+        """检查单词是否存在（首次调用时建立小写单词集合，文件未变化时之后的检查都是O(1)）"""
         try:
             with self._safe_file_lock('r') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if row and row[0].lower() == word_lower:
-                        return True
-            return False
+                key = self._fstat_key(f)
+                cached = self._word_set
+                if cached is None or cached[0] != key:
+                    words = self._load_word_set(key) if cached is None else None
+                    if words is None:
+                        rows = csv.reader(io.StringIO(self._read_mapped(f), newline=''))
+                        words = {row[0].strip().lower() for row in rows if row}
+                        # 持有文件锁时从文件内容重建，key与集合一定对应同一个文件版本
+                        self._save_word_set(key, words)
+                    cached = self._word_set = (key, words)
+            return word.strip().lower() in cached[1]
         except Exception as e:
             print(f"检查单词存在性失败: {e}")
             return False
     
-    def _create_backup(self):
-        """创建备份文件"""
+    def _load_word_set(self, key: Tuple[int, int]) -> Optional[Set[str]]:
+        """持久化的单词集合与文件当前的 (mtime_ns, size) 一致时返回它，否则返回None"""
         try:
-            if os.path.exists(self.file_path):
-                import shutil
-                shutil.copy2(self.file_path, self.backup_path)
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            saved_key, words = tuple(saved['stat']), saved['words']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if saved_key != key or not all(isinstance(w, str) for w in words):
+            return None
+        return set(words)
+    
+    def _save_word_set(self, key: Tuple[int, int], words: Set[str]):
+        """原子替换持久化的单词集合（临时文件名唯一，多个进程同时写入不会互相覆盖一半）"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.keys_path)),
+                                            suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'stat': list(key), 'words': sorted(words)}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.keys_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            print(f"写入单词缓存文件失败: {e}")
+    
+    @staticmethod
+    def _fstat_key(f) -> Tuple[int, int]:
+        st = os.fstat(f.fileno())
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _track_appended(self, f, before: Tuple[int, int], words_data: List[List[str]]):
+        """追加成功后更新单词集合；追加前文件已被其他进程改过则留到下次检查时重建"""
+        cached = self._word_set
+        if cached is None or cached[0] != before:
+            return
+        words = cached[1]
+        words.update(row[0].strip().lower() for row in words_data if row)
+        self._word_set = (self._fstat_key(f), words)
+    
+    @staticmethod
+    def _content_equals(f, encoded: bytes) -> bool:
+        """已加锁文件的内容是否与encoded逐字节相同（大小不同直接返回，相同时才与mmap映射的内容比较）"""
+        size = os.fstat(f.fileno()).st_size
+        if size != len(encoded):
+            return False
+        if not size:
+            return True
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m, memoryview(m) as view:
+            return view == encoded
+    
+    def _backup_locked(self, f) -> bool:
+        """把已加锁文件的当前内容写入备份文件（直接写出mmap映射的内容），返回是否成功"""
+        try:
+            size = os.fstat(f.fileno()).st_size
+            with open(self.backup_path, 'wb') as backup:
+                if size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                        backup.write(m)
+            return True
         except Exception as e:
             print(f"创建备份失败: {e}")
+            return False
     
     def _restore_backup(self):
         """从备份恢复文件"""
@@ -122,6 +420,181 @@ class SafeCSVHandler:
             print(f"从备份恢复失败: {e}")
 
 
+class SQLiteWordIndex:
+    """
+    CSV的SQLite单词索引，用B树主键做查重，不需要把全部单词放进内存
+    CSV仍是唯一数据源：CSV的 (mtime, size) 变化后自动重建索引
+    """
+    
+    def __init__(self, db_path: str, csv_path: str):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """每个进程使用自己的持久连接（fork后的子进程重新连接）"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("CREATE TABLE IF NOT EXISTS w "
+                         "(word TEXT PRIMARY KEY, def TEXT, added DATE, last DATE, rc INT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+    
+    @staticmethod
+    def _stat_value(key: Tuple[int, int]) -> str:
+        return f"{key[0]}:{key[1]}"
+    
+    def _csv_stat(self) -> Optional[str]:
+        try:
+            st = os.stat(self.csv_path)
+        except OSError:
+            return None
+        return self._stat_value((st.st_mtime_ns, st.st_size))
+    
+    def _sync(self, conn: sqlite3.Connection):
+        """CSV自上次同步后被修改时，从CSV重建索引"""
+        csv_stat = self._csv_stat()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'csv_stat'").fetchone()
+        if row is not None and row[0] == csv_stat:
+            return
+        
+        # csv_stat在读取之前取得：读取期间CSV又被追加时记录的状态比内容旧，下次查询会再次重建
+        rows = [(r[0].strip().lower(), *r[1:5])
+                for r in get_csv_handler(self.csv_path).read_all_words() if len(r) >= 5]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM w")
+            conn.executemany("INSERT OR IGNORE INTO w VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_stat', ?)",
+                         (csv_stat,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def contains(self, word: str) -> bool:
+        """检查单词是否存在（忽略大小写）"""
+        with self._lock:
+            conn = self._connection()
+            self._sync(conn)
+            return conn.execute("SELECT 1 FROM w WHERE word = ? LIMIT 1",
+                                (word.strip().lower(),)).fetchone() is not None
+    
+    def add(self, words_data: List[List[str]], before: Tuple[int, int], after: Tuple[int, int]):
+        """
+        CSV追加成功后同步写入索引，before/after为追加锁内取得的CSV (mtime_ns, size)
+        只有追加前的状态与索引记录的一致（期间没有其他进程修改CSV）时才插入新行并记录追加后的状态；
+        否则删除记录的状态，下次查询时从CSV重建
+        """
+        rows = [(r[0].strip().lower(), *r[1:5]) for r in words_data if r]
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'csv_stat'").fetchone()
+                if row is not None and row[0] == self._stat_value(before):
+                    conn.executemany("INSERT OR IGNORE INTO w VALUES (?, ?, ?, ?, ?)", rows)
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'csv_stat'",
+                                 (self._stat_value(after),))
+                else:
+                    conn.execute("DELETE FROM meta WHERE key = 'csv_stat'")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+
+def _code_points(values, width: int):
+    """把字符串序列转成 (n, width) 的Unicode码点矩阵（超长部分截断），以及各自的实际长度"""
+    import numpy as np
+    
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    codes = np.array(values, dtype=f'U{width}').view(np.uint32).reshape(len(values), width).astype(np.int64)
+    return codes, lengths
+
+
+def valid_iso_dates(values):
+    """向量化判断 YYYY-MM-DD 形式（补零）的日期是否合法，返回布尔数组（需要NumPy）"""
+    import numpy as np
+    
+    codes, lengths = _code_points(values, 10)
+    digits = codes - ord('0')
+    is_digit = (digits >= 0) & (digits <= 9)
+    shaped = ((lengths == 10)
+              & is_digit[:, [0, 1, 2, 3, 5, 6, 8, 9]].all(axis=1)
+              & (codes[:, 4] == ord('-')) & (codes[:, 7] == ord('-')))
+    
+    digits = np.where(is_digit, digits, 0)
+    year = digits[:, :4] @ np.array([1000, 100, 10, 1])
+    month = digits[:, 5] * 10 + digits[:, 6]
+    day = digits[:, 8] * 10 + digits[:, 9]
+    
+    month_days = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days_in_month = month_days[np.clip(month, 1, 12) - 1] + ((month == 2) & leap)
+    return shaped & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= days_in_month)
+
+
+def plain_digit_strings(values, width: int = 9):
+    """向量化判断字符串是否为纯ASCII数字（不超过width位），返回布尔数组（需要NumPy）"""
+    import numpy as np
+    
+    codes, lengths = _code_points(values, width)
+    in_string = np.arange(width) < lengths[:, None]
+    is_digit = (codes >= ord('0')) & (codes <= ord('9'))
+    return (lengths >= 1) & (lengths <= width) & (is_digit | ~in_string).all(axis=1)
+
+
+class WordColumns:
+    """
+    按列存放的单词表（SoA）：文本列为元组，数值列按需转换为NumPy数组（需要NumPy）
+    列数不是5的行补空或截断到5列，可通过 lengths / complete 区分
+    """
+    
+    def __init__(self, rows: List[List[str]]):
+        import numpy as np
+        
+        self.lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        self.complete = self.lengths == 5
+        padded = [row if len(row) == 5 else (row + [''] * 5)[:5] for row in rows]
+        columns = tuple(zip(*padded)) if padded else ((),) * 5
+        self.words, self.definitions, self.added_dates, self.last_dates, self.counts = columns
+    
+    @cached_property
+    def count_ok(self):
+        """复习次数为纯数字"""
+        return plain_digit_strings(self.counts)
+    
+    @cached_property
+    def review_count(self):
+        """复习次数（int64，非纯数字的行为0）"""
+        import numpy as np
+        return np.array([c if ok else '0' for c, ok in zip(self.counts, self.count_ok)]).astype(np.int64)
+    
+    @cached_property
+    def added_ok(self):
+        """添加日期为合法的 YYYY-MM-DD"""
+        return valid_iso_dates(self.added_dates)
+    
+    @cached_property
+    def last_ok(self):
+        """上次复习日期为合法的 YYYY-MM-DD"""
+        return valid_iso_dates(self.last_dates)
+    
+    @cached_property
+    def last_day(self):
+        """上次复习日期（距1970-01-01的天数，不合法的行为0）"""
+        import numpy as np
+        return np.array([d if ok else '1970-01-01' for d, ok in zip(self.last_dates, self.last_ok)],
+                        dtype='datetime64[D]').astype(np.int64)
+
+
 # 全局CSV处理器实例（单例模式）
 _csv_handler = None
 
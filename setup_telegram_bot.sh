@@ -32,7 +32,7 @@ info "Python版本: $python_version"
 
 # 2. 安装依赖
 info "安装Telegram Bot依赖包..."
-pip3 install python-telegram-bot==20.7 --quiet
+pip3 install "python-telegram-bot[rate-limiter]==20.7" --quiet
 success "依赖包安装完成"
 
 # 3. 创建Bot配置文件
@@ -62,6 +62,10 @@ WORDS_PER_PUSH=15
 # Telegram Bot 配置
 TELEGRAM_BOT_TOKEN=
 TELEGRAM_USER_ID=
+# 可选：Webhook模式（需 pip3 install "python-telegram-bot[webhooks]==20.7"），不设置则使用长轮询
+# TELEGRAM_WEBHOOK_URL=https://your-domain/telegram-webhook
+# TELEGRAM_WEBHOOK_PORT=8443
+# TELEGRAM_WEBHOOK_SECRET=
 EOF
 fi
 
@@ -178,12 +182,14 @@ cat > "$PROJECT_DIR/migrate_csv_to_telegram.py" << 'EOF'
 CSV数据迁移到Telegram Bot数据库
 """
 
-import csv
 import sqlite3
 import os
+import sys
 from datetime import datetime, date, timedelta
 from pathlib import Path
 
+from safe_csv import get_csv_handler
+
 def load_env():
     """加载环境变量"""
     env_file = Path(__file__).parent / '.env'
@@ -249,52 +255,53 @@ def migrate_data(csv_path, db_path, default_user_id=None):
     skipped_count = 0
     
     try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
+        # 通过SafeCSVHandler读取：加锁，并合并 words.csv.journal 中尚未写回CSV的复习状态；
+        # 读取失败时直接抛出异常，整个迁移失败，而不是当作空文件“迁移成功”
+        rows = list(get_csv_handler(str(csv_path)).iter_words())
+        
+        for row_num, row in enumerate(rows, 1):
+            if len(row) < 5:
+                print(f"⚠️ 跳过第{row_num}行，数据不完整: {row}")
+                skipped_count += 1
+                continue
             
-            for row_num, row in enumerate(reader, 1):
-                if len(row) < 5:
-                    print(f"⚠️ 跳过第{row_num}行，数据不完整: {row}")
-                    skipped_count += 1
-                    continue
+            word, definition, added_date, last_reviewed_date, review_count = row[:5]
+            
+            try:
+                review_count = int(review_count)
                 
-                word, definition, added_date, last_reviewed_date, review_count = row[:5]
+                # 计算下次复习日期
+                next_review_date = calculate_next_review_date(
+                    review_count, 
+                    last_reviewed_date if last_reviewed_date else None
+                )
                 
-                try:
-                    review_count = int(review_count)
-                    
-                    # 计算下次复习日期
-                    next_review_date = calculate_next_review_date(
-                        review_count, 
-                        last_reviewed_date if last_reviewed_date else None
-                    )
-                    
-                    # 插入数据
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO words 
-                        (user_id, word, definition, added_date, last_reviewed_date, 
-                         review_count, next_review_date, created_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                    ''', (
-                        default_user_id,
-                        word.lower().strip(),
-                        definition.strip(),
-                        added_date,
-                        last_reviewed_date if last_reviewed_date else None,
-                        review_count,
-                        next_review_date
-                    ))
-                    
-                    if cursor.rowcount > 0:
-                        migrated_count += 1
-                    else:
-                        skipped_count += 1
-                        
-                except (ValueError, sqlite3.Error) as e:
-                    print(f"⚠️ 跳过第{row_num}行，处理失败: {e}")
+                # 插入数据
+                cursor.execute('''
+                    INSERT OR IGNORE INTO words 
+                    (user_id, word, definition, added_date, last_reviewed_date, 
+                     review_count, next_review_date, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (
+                    default_user_id,
+                    word.lower().strip(),
+                    definition.strip(),
+                    added_date,
+                    last_reviewed_date if last_reviewed_date else None,
+                    review_count,
+                    next_review_date
+                ))
+                
+                if cursor.rowcount > 0:
+                    migrated_count += 1
+                else:
                     skipped_count += 1
-                    continue
-    
+                    
+            except (ValueError, sqlite3.Error) as e:
+                print(f"⚠️ 跳过第{row_num}行，处理失败: {e}")
+                skipped_count += 1
+                continue
+
         conn.commit()
         
         print(f"✅ 数据迁移完成!")
@@ -342,6 +349,7 @@ def main():
         print("\n🎉 迁移完成！现在可以启动Telegram Bot了")
     else:
         print("\n❌ 迁移失败，请检查错误信息")
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -9,15 +9,21 @@ import logging
 import os
 import sqlite3
 import json
+import re
 import asyncio
-from datetime import datetime, date, timedelta
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 from pathlib import Path
+from urllib.parse import urlparse
 
 import telegram
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import (
     Application, 
+    BaseUpdateProcessor, 
     CommandHandler, 
     MessageHandler, 
     CallbackQueryHandler, 
@@ -32,21 +38,86 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 学习统计缓存有效期（秒）；用户自己添加单词、复习后立即失效
+STATS_CACHE_TTL = 30
+# 最多保留多少个用户的会话状态（添加单词、搜索、复习中的进度）
+MAX_USER_STATES = 10000
+# 最多同时处理多少个更新（不同用户的消息并发处理，同一用户的消息仍按顺序处理）
+MAX_CONCURRENT_UPDATES = 32
+
 # 艾宾浩斯记忆曲线间隔（天）
 REVIEW_INTERVALS = [1, 2, 4, 7, 15, 30, 60]
+# 掌握后的下次复习间隔：按复习次数+1取REVIEW_INTERVALS中的间隔（超出预设阶段的次数使用最后一个间隔）
+_NEXT_INTERVAL_SQL = (f"CASE MIN(review_count + 1, {len(REVIEW_INTERVALS) - 1}) "
+                      + " ".join(f"WHEN {i} THEN {days}" for i, days in enumerate(REVIEW_INTERVALS))
+                      + " END")
+# 更新复习状态的语句只在模块加载时拼接一次，之后每次执行都命中sqlite3的预编译语句缓存
+_UPDATE_REVIEW_SQL = f'''
+    UPDATE words 
+    SET review_count = CASE WHEN :mastered THEN review_count + 1 ELSE MAX(1, review_count) END, 
+        last_reviewed_date = CURRENT_DATE,
+        next_review_date = date('now', 'localtime', '+' || CASE WHEN :mastered THEN {_NEXT_INTERVAL_SQL}
+                                                              ELSE :retry_days END || ' days'),
+        difficulty_rating = COALESCE(:difficulty, CASE WHEN :mastered
+                                                  THEN MAX(1, difficulty_rating - 1)
+                                                  ELSE MIN(5, difficulty_rating + 1) END),
+        mastery_level = CASE WHEN :mastered THEN mastery_level + 1 ELSE mastery_level END,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = :word_id
+'''
 
 class DatabaseManager:
     """数据库管理器"""
     
     def __init__(self, db_path: str):
         self.db_path = db_path
+        # 整个Bot共用一个持久连接：不必每次操作都重新打开数据库、解析schema，页缓存也得以保留
+        # 处理器可能在不同线程中执行，所有访问都要持有同一把锁
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # WAL模式下提交只追加WAL并按NORMAL同步，不必每次fsync回滚日志，读者也不会被写入阻塞
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA cache_size=-64000")  # 约64MB页缓存
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.execute("PRAGMA busy_timeout=5000")  # 其他进程持有写锁时最多等待5秒
+        self._lock = threading.RLock()
+        # 导出专用的只读连接（首次导出时打开），导出期间不占用主连接的锁
+        self._export_conn = None
+        self._export_lock = threading.Lock()
         self.init_database()
     
+    def close(self):
+        """关闭数据库连接（Bot退出时调用，关闭前让SQLite按本次运行的查询更新索引统计信息）"""
+        with self._export_lock:
+            if self._export_conn is not None:
+                self._export_conn.close()
+                self._export_conn = None
+        with self._lock:
+            self._conn.execute("PRAGMA optimize")
+            self._conn.close()
+    
+    def _get_export_connection(self) -> sqlite3.Connection:
+        """返回导出用的只读连接（调用方需持有 _export_lock）"""
+        if self._export_conn is None:
+            conn = sqlite3.connect(Path(self.db_path).resolve().as_uri() + '?mode=ro',
+                                   uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._export_conn = conn
+        return self._export_conn
+    
     def init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        with self._lock, self._conn:
+            self._create_tables(self._conn.cursor())
+            self._fts = self._create_search_index(self._conn.cursor())
+        logger.info("数据库初始化完成")
+    
+    @staticmethod
+    def _create_tables(cursor: sqlite3.Cursor):
+        """创建所有数据表"""
         # 用户表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -115,15 +186,71 @@ class DatabaseManager:
             )
         ''')
         
-        conn.commit()
-        conn.close()
-        logger.info("数据库初始化完成")
+        # 常用查询的索引：待复习单词、最近添加、掌握程度统计、复习会话统计
+        # 待复习单词的索引按查询的排序表达式建立，按索引顺序读出即已排好序，不需要临时B树排序
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_words_due_sort '
+                       'ON words (user_id, (CASE WHEN review_count = 0 THEN 0 ELSE 1 END), '
+                       'next_review_date, difficulty_rating DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_words_user_created '
+                       'ON words (user_id, created_at DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_words_mastery '
+                       'ON words (user_id, mastery_level)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user_date '
+                       'ON review_sessions (user_id, session_date DESC)')
+    
+    @staticmethod
+    def _create_search_index(cursor: sqlite3.Cursor) -> bool:
+        """
+        建立单词的FTS5全文索引（trigram分词，支持中英文子串匹配），由触发器与words表保持同步
+        SQLite不支持FTS5或trigram分词时返回False，搜索退回LIKE全表扫描
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'words_fts'")
+        existed = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+                    word, definition, pronunciation,
+                    content='words', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5全文索引不可用，搜索使用LIKE: {e}")
+            return False
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS words_fts_insert AFTER INSERT ON words BEGIN
+                INSERT INTO words_fts (rowid, word, definition, pronunciation)
+                VALUES (new.id, new.word, new.definition, new.pronunciation);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS words_fts_delete AFTER DELETE ON words BEGIN
+                INSERT INTO words_fts (words_fts, rowid, word, definition, pronunciation)
+                VALUES ('delete', old.id, old.word, old.definition, old.pronunciation);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS words_fts_update
+            AFTER UPDATE OF word, definition, pronunciation ON words BEGIN
+                INSERT INTO words_fts (words_fts, rowid, word, definition, pronunciation)
+                VALUES ('delete', old.id, old.word, old.definition, old.pronunciation);
+                INSERT INTO words_fts (rowid, word, definition, pronunciation)
+                VALUES (new.id, new.word, new.definition, new.pronunciation);
+            END
+        ''')
+        
+        if not existed:
+            # 索引是新建的：把已有的单词全部加进索引
+            cursor.execute("INSERT INTO words_fts (words_fts) VALUES ('rebuild')")
+        return True
     
     def create_or_update_user(self, user_data: Dict):
         """创建或更新用户"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        with self._lock, self._conn:
+            self._upsert_user(self._conn.cursor(), user_data)
+    
+    @staticmethod
+    def _upsert_user(cursor: sqlite3.Cursor, user_data: Dict):
         cursor.execute('''
             INSERT OR REPLACE INTO users 
             (user_id, username, first_name, language_code, last_active, updated_at)
@@ -140,26 +267,16 @@ class DatabaseManager:
             INSERT OR IGNORE INTO user_preferences (user_id)
             VALUES (?)
         ''', (user_data['user_id'],))
-        
-        conn.commit()
-        conn.close()
     
     def add_word(self, user_id: int, word: str, definition: str, pronunciation: str = None) -> bool:
         """添加单词"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 计算下次复习日期（新单词1天后复习）
-            next_review = (date.today() + timedelta(days=1)).isoformat()
-            
-            cursor.execute('''
-                INSERT INTO words (user_id, word, definition, pronunciation, next_review_date)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, word.lower().strip(), definition.strip(), pronunciation, next_review))
-            
-            conn.commit()
-            conn.close()
+            # 下次复习日期由SQLite按本地日期计算（新单词1天后复习）
+            with self._lock, self._conn:
+                self._conn.execute('''
+                    INSERT INTO words (user_id, word, definition, pronunciation, next_review_date)
+                    VALUES (?, ?, ?, ?, date('now', 'localtime', '+1 day'))
+                ''', (user_id, word.lower().strip(), definition.strip(), pronunciation))
             return True
         except sqlite3.IntegrityError:
             # 单词已存在
@@ -168,124 +285,86 @@ class DatabaseManager:
             logger.error(f"添加单词失败: {e}")
             return False
     
+    def add_words_bulk(self, user_id: int, rows: List[Tuple[str, str, Optional[str]]]) -> int:
+        """批量添加单词 (单词, 释义, 音标)，全部在一个事务内插入；已存在的单词跳过，返回实际添加的数量"""
+        try:
+            params = [(user_id, word.lower().strip(), definition.strip(), pronunciation)
+                      for word, definition, pronunciation in rows]
+            
+            with self._lock, self._conn:
+                cursor = self._conn.executemany('''
+                    INSERT OR IGNORE INTO words (user_id, word, definition, pronunciation, next_review_date)
+                    VALUES (?, ?, ?, ?, date('now', 'localtime', '+1 day'))
+                ''', params)
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"批量添加单词失败: {e}")
+            return 0
+    
     def get_words_for_review(self, user_id: int, limit: int = 10) -> List[Dict]:
-        """获取需要复习的单词"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        today = date.today().isoformat()
-        
-        cursor.execute('''
-            SELECT * FROM words 
-            WHERE user_id = ? AND (
-                review_count = 0 OR 
-                (next_review_date IS NOT NULL AND next_review_date <= ?)
-            )
-            ORDER BY 
-                CASE WHEN review_count = 0 THEN 0 ELSE 1 END,
-                next_review_date ASC,
-                difficulty_rating DESC
-            LIMIT ?
-        ''', (user_id, today, limit))
-        
-        words = cursor.fetchall()
-        conn.close()
+        """获取需要复习的单词（只包含复习界面需要的列）"""
+        # 排序表达式与idx_words_due_sort的索引列一致，直接按索引顺序读出；只取复习界面用到的列
+        with self._lock:
+            words = self._conn.execute('''
+                SELECT id, word, definition, pronunciation, example_sentence,
+                       review_count, next_review_date, difficulty_rating, mastery_level
+                FROM words 
+                WHERE user_id = ? AND (
+                    review_count = 0 OR 
+                    (next_review_date IS NOT NULL AND next_review_date <= date('now', 'localtime'))
+                )
+                ORDER BY 
+                    CASE WHEN review_count = 0 THEN 0 ELSE 1 END,
+                    next_review_date ASC,
+                    difficulty_rating DESC
+                LIMIT ?
+            ''', (user_id, limit)).fetchall()
         
         return [dict(word) for word in words]
     
     def update_word_review(self, word_id: int, mastered: bool = True, difficulty: int = None):
-        """更新单词复习状态"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 获取当前复习次数
-        cursor.execute('SELECT review_count, difficulty_rating FROM words WHERE id = ?', (word_id,))
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return
-        
-        current_review_count, current_difficulty = result
-        new_review_count = current_review_count + 1
-        
-        # 更新难度评级
-        if difficulty is not None:
-            new_difficulty = difficulty
-        else:
-            # 根据掌握情况自动调整难度
-            if mastered:
-                new_difficulty = max(1, current_difficulty - 1)
-            else:
-                new_difficulty = min(5, current_difficulty + 1)
-        
-        # 计算下次复习日期
-        if mastered:
-            interval_index = min(new_review_count, len(REVIEW_INTERVALS) - 1)
-            interval_days = REVIEW_INTERVALS[interval_index]
-        else:
-            # 如果没掌握，使用较短间隔
-            interval_days = max(1, REVIEW_INTERVALS[0] // 2)
-            new_review_count = max(1, current_review_count)
-        
-        next_review_date = (date.today() + timedelta(days=interval_days)).isoformat()
-        
-        cursor.execute('''
-            UPDATE words 
-            SET review_count = ?, 
-                last_reviewed_date = CURRENT_DATE,
-                next_review_date = ?,
-                difficulty_rating = ?,
-                mastery_level = CASE WHEN ? THEN mastery_level + 1 ELSE mastery_level END,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (new_review_count, next_review_date, new_difficulty, mastered, word_id))
-        
-        conn.commit()
-        conn.close()
+        """更新单词复习状态（新的复习次数、难度和下次复习日期都由同一条UPDATE语句按原值计算）"""
+        # 如果没掌握，使用较短间隔
+        retry_days = max(1, REVIEW_INTERVALS[0] // 2)
+        
+        with self._lock, self._conn:
+            self._conn.execute(_UPDATE_REVIEW_SQL, {
+                'mastered': mastered,
+                'retry_days': retry_days,
+                'difficulty': difficulty,
+                'word_id': word_id
+            })
     
     def get_user_stats(self, user_id: int) -> Dict:
         """获取用户学习统计"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 总单词数
-        cursor.execute('SELECT COUNT(*) FROM words WHERE user_id = ?', (user_id,))
-        total_words = cursor.fetchone()[0]
-        
-        # 新单词数
-        cursor.execute('SELECT COUNT(*) FROM words WHERE user_id = ? AND review_count = 0', (user_id,))
-        new_words = cursor.fetchone()[0]
-        
-        # 需要复习的单词数
-        today = date.today().isoformat()
+        with self._lock:
+            return self._user_stats(self._conn.cursor(), user_id)
+    
+    @staticmethod
+    def _user_stats(cursor: sqlite3.Cursor, user_id: int) -> Dict:
+        # 一条语句同时返回两张表的聚合结果：
+        # 单词统计（总数、新单词、需要复习、掌握程度高的单词）一次扫描同时计算；
+        # 复习会话统计（今日复习数和连续学习天数，即最近30天内有复习的天数），今天也在30天范围内
         cursor.execute('''
-            SELECT COUNT(*) FROM words 
-            WHERE user_id = ? AND next_review_date <= ?
-        ''', (user_id, today))
-        due_words = cursor.fetchone()[0]
-        
-        # 掌握程度高的单词数
-        cursor.execute('SELECT COUNT(*) FROM words WHERE user_id = ? AND mastery_level >= 3', (user_id,))
-        mastered_words = cursor.fetchone()[0]
-        
-        # 今日复习统计
-        cursor.execute('''
-            SELECT COALESCE(SUM(words_reviewed), 0), COALESCE(SUM(correct_answers), 0)
-            FROM review_sessions 
-            WHERE user_id = ? AND session_date = CURRENT_DATE
-        ''', (user_id,))
-        today_reviewed, today_correct = cursor.fetchone()
-        
-        # 连续学习天数
-        cursor.execute('''
-            SELECT COUNT(DISTINCT session_date) as streak
-            FROM review_sessions 
-            WHERE user_id = ? AND session_date >= date('now', '-30 days')
-        ''', (user_id,))
-        learning_streak = cursor.fetchone()[0]
-        
-        conn.close()
+            SELECT w.total_words, w.new_words, w.due_words, w.mastered_words,
+                   s.today_reviewed, s.today_correct, s.learning_streak
+            FROM (
+                SELECT COUNT(*) AS total_words,
+                       COALESCE(SUM(CASE WHEN review_count = 0 THEN 1 ELSE 0 END), 0) AS new_words,
+                       COALESCE(SUM(CASE WHEN next_review_date <= date('now', 'localtime') THEN 1 ELSE 0 END), 0) AS due_words,
+                       COALESCE(SUM(CASE WHEN mastery_level >= 3 THEN 1 ELSE 0 END), 0) AS mastered_words
+                FROM words 
+                WHERE user_id = :user_id
+            ) AS w, (
+                SELECT COALESCE(SUM(CASE WHEN session_date = CURRENT_DATE THEN words_reviewed END), 0) AS today_reviewed,
+                       COALESCE(SUM(CASE WHEN session_date = CURRENT_DATE THEN correct_answers END), 0) AS today_correct,
+                       COUNT(DISTINCT session_date) AS learning_streak
+                FROM review_sessions 
+                WHERE user_id = :user_id AND session_date >= date('now', '-30 days')
+            ) AS s
+        ''', {'user_id': user_id})
+        (total_words, new_words, due_words, mastered_words,
+         today_reviewed, today_correct, learning_streak) = cursor.fetchone()
         
         return {
             'total_words': total_words,
@@ -300,101 +379,135 @@ class DatabaseManager:
     
     def search_words(self, user_id: int, query: str, limit: int = 10) -> List[Dict]:
         """搜索单词"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        # 支持中英文搜索（单词入库时已统一转为小写，完全匹配的排序直接与query.lower()比较）
+        if self._fts and len(query) >= 3 and '%' not in query and '_' not in query:
+            # trigram索引只能匹配至少3个字符的子串；作为短语查询，结果与下面的LIKE相同
+            # 释义中匹配的部分由FTS5的highlight()直接用Markdown粗体标出
+            with self._lock:
+                words = self._conn.execute('''
+                    SELECT w.id, w.word, w.definition, w.pronunciation,
+                           w.review_count, w.next_review_date, w.mastery_level,
+                           highlight(words_fts, 1, '*', '*') AS highlighted_definition
+                    FROM words_fts JOIN words w ON w.id = words_fts.rowid
+                    WHERE words_fts MATCH ? AND w.user_id = ?
+                    ORDER BY 
+                        CASE WHEN w.word = ? THEN 1 ELSE 2 END,
+                        w.word
+                    LIMIT ?
+                ''', ('"' + query.lower().replace('"', '""') + '"', user_id, query.lower(), limit)).fetchall()
+            return [dict(word) for word in words]
         
-        # 支持中英文搜索
         search_query = f"%{query.lower()}%"
         
-        cursor.execute('''
-            SELECT * FROM words 
-            WHERE user_id = ? AND (
-                LOWER(word) LIKE ? OR 
-                LOWER(definition) LIKE ? OR
-                LOWER(pronunciation) LIKE ?
-            )
-            ORDER BY 
-                CASE WHEN LOWER(word) = LOWER(?) THEN 1 ELSE 2 END,
-                word
-            LIMIT ?
-        ''', (user_id, search_query, search_query, search_query, query.lower(), limit))
-        
-        words = cursor.fetchall()
-        conn.close()
+        with self._lock:
+            words = self._conn.execute('''
+                SELECT id, word, definition, pronunciation,
+                       review_count, next_review_date, mastery_level
+                FROM words 
+                WHERE user_id = ? AND (
+                    LOWER(word) LIKE ? OR 
+                    LOWER(definition) LIKE ? OR
+                    LOWER(pronunciation) LIKE ?
+                )
+                ORDER BY 
+                    CASE WHEN word = ? THEN 1 ELSE 2 END,
+                    word
+                LIMIT ?
+            ''', (user_id, search_query, search_query, search_query, query.lower(), limit)).fetchall()
         
         return [dict(word) for word in words]
     
     def delete_word(self, user_id: int, word: str) -> bool:
-        """删除单词"""
+        """删除单词（单词入库时已统一转为小写，直接按UNIQUE(user_id, word)索引查找）"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._lock, self._conn:
+                cursor = self._conn.execute('''
+                    DELETE FROM words 
+                    WHERE user_id = ? AND word = ?
+                ''', (user_id, word.lower().strip()))
             
-            cursor.execute('''
-                DELETE FROM words 
-                WHERE user_id = ? AND LOWER(word) = LOWER(?)
-            ''', (user_id, word.strip()))
-            
-            deleted = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
-            
-            return deleted
+            return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"删除单词失败: {e}")
             return False
     
     def get_recent_words(self, user_id: int, limit: int = 10) -> List[Dict]:
         """获取最近添加的单词"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM words 
-            WHERE user_id = ? 
-            ORDER BY created_at DESC 
-            LIMIT ?
-        ''', (user_id, limit))
-        
-        words = cursor.fetchall()
-        conn.close()
+        with self._lock:
+            words = self._conn.execute('''
+                SELECT id, word, definition, pronunciation, added_date,
+                       review_count, next_review_date, mastery_level
+                FROM words 
+                WHERE user_id = ? 
+                ORDER BY created_at DESC 
+                LIMIT ?
+            ''', (user_id, limit)).fetchall()
         
         return [dict(word) for word in words]
-
-class GREBot:
-    """GRE词汇学习Bot"""
     
-    def __init__(self, project_root: Path):
-        self.project_root = Path(project_root)
-        self.db_path = self.project_root / "telegram_bot.db"
-        self.db = DatabaseManager(str(self.db_path))
-        self.user_states: Dict[int, Dict] = {}  # 用户状态管理
-        
-        # 加载配置
-        self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        if not self.bot_token:
-            raise ValueError("请设置TELEGRAM_BOT_TOKEN环境变量")
-        
-        logger.info(f"Bot初始化完成，数据库路径: {self.db_path}")
+    def add_review_session(self, user_id: int, words_reviewed: int, correct_answers: int,
+                           duration_seconds: int):
+        """记录一次复习会话"""
+        with self._lock, self._conn:
+            self._conn.execute('''
+                INSERT INTO review_sessions 
+                (user_id, words_reviewed, correct_answers, session_duration_seconds)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, words_reviewed, correct_answers, duration_seconds))
     
-    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """开始命令"""
-        user = update.effective_user
-        
-        # 保存用户信息
-        self.db.create_or_update_user({
-            'user_id': user.id,
-            'username': user.username,
-            'first_name': user.first_name,
-            'language_code': user.language_code
-        })
-        
-        welcome_text = f"""
+    def write_export(self, user_id: int, f, export_date: str) -> int:
+        """把用户所有单词以JSON格式写入二进制文件f（用于导出），返回导出的单词数
+        
+        逐行遍历游标并依次写出，不在内存中构造完整的单词列表；
+        输出与 json.dump(..., ensure_ascii=False, indent=2) 完全相同
+        
+        使用单独的只读连接：WAL模式下读事务看到一致的快照，不阻塞也不等待其他用户的读写，
+        序列化和写文件（可能写到磁盘）期间也不持有主连接的锁"""
+        with self._export_lock:
+            conn = self._get_export_connection()
+            # 计数和读取单词在同一个读事务内，total_words与导出的单词一致
+            conn.execute("BEGIN")
+            try:
+                return self._write_export_rows(conn, user_id, f, export_date)
+            finally:
+                conn.rollback()
+    
+    @staticmethod
+    def _write_export_rows(conn: sqlite3.Connection, user_id: int, f, export_date: str) -> int:
+        total_words = conn.execute(
+            'SELECT COUNT(*) FROM words WHERE user_id = ?', (user_id,)
+        ).fetchone()[0]
+        if not total_words:
+            return 0
+        
+        header = json.dumps({
+            'export_date': export_date,
+            'user_id': user_id,
+            'total_words': total_words
+        }, ensure_ascii=False, indent=2)
+        # 去掉结尾的"\n}"，接着写入单词列表
+        f.write(header[:-2].encode('utf-8') + b',\n  "words": [')
+        cursor = conn.execute('''
+            SELECT word, definition, pronunciation, added_date, 
+                   last_reviewed_date, review_count, mastery_level
+            FROM words 
+            WHERE user_id = ?
+            ORDER BY added_date DESC
+        ''', (user_id,))
+        separator = b'\n'
+        for word in cursor:
+            item = json.dumps(dict(word), ensure_ascii=False, indent=2)
+            f.write(separator + ('    ' + item.replace('\n', '\n    ')).encode('utf-8'))
+            separator = b',\n'
+        f.write(b'\n  ]\n}')
+        
+        return total_words
+
+# /start 和 /help 的固定文本和按钮在导入时生成一次，每次命令只需填入用户名
+_WELCOME_TEMPLATE = """
 🧠 **欢迎使用GRE词汇学习助手！**
 
-你好 {user.first_name}！我是你的专属GRE词汇学习伙伴 🤖
+你好 {first_name}！我是你的专属GRE词汇学习伙伴 🤖
 
 **✨ 我能帮你做什么：**
 
@@ -417,30 +530,26 @@ class GREBot:
 • 记录详细学习数据和进度
 
 开始你的GRE词汇之旅吧！使用 /add 添加第一个单词 📝
-        """
-        
-        keyboard = [
-            [
-                InlineKeyboardButton("📝 添加单词", callback_data="quick_add"),
-                InlineKeyboardButton("📖 开始复习", callback_data="quick_review")
-            ],
-            [
-                InlineKeyboardButton("📊 学习统计", callback_data="quick_stats"),
-                InlineKeyboardButton("❓ 帮助指南", callback_data="quick_help")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(
-            welcome_text.strip(), 
-            parse_mode='Markdown',
-            reply_markup=reply_markup
-        )
-    
-    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """帮助命令"""
-        help_text = """
+""".strip()
+
+_START_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📝 添加单词", callback_data="quick_add"),
+        InlineKeyboardButton("📖 开始复习", callback_data="quick_review")
+    ],
+    [
+        InlineKeyboardButton("📊 学习统计", callback_data="quick_stats"),
+        InlineKeyboardButton("❓ 帮助指南", callback_data="quick_help")
+    ]
+])
+
+# 普通消息的意图关键词在导入时编译，按原有优先级（添加 > 复习 > 搜索）依次匹配；
+# re.ASCII 使忽略大小写只作用于ASCII字母，与先 lower() 再查找子串的结果一致
+_ADD_INTENT_RE = re.compile('add|添加|new|新', re.IGNORECASE | re.ASCII)
+_REVIEW_INTENT_RE = re.compile('review|复习|study|学习', re.IGNORECASE | re.ASCII)
+_SEARCH_INTENT_RE = re.compile('search|搜索|find|查找', re.IGNORECASE | re.ASCII)
+
+_HELP_TEXT = """
 📖 **GRE词汇助手完整指南**
 
 **📝 添加单词**
@@ -478,9 +587,119 @@ class GREBot:
 • 定期查看统计数据调整学习策略
 
 有问题随时问我！ 🤗
+""".strip()
+
+class UserStates(OrderedDict):
+    """用户会话状态（用户ID -> 状态字典），超过max_users个用户时丢弃最久没有更新的状态"""
+    
+    def __init__(self, max_users: int = MAX_USER_STATES):
+        super().__init__()
+        self.max_users = max_users
+    
+    def __setitem__(self, user_id: int, state: Dict):
+        super().__setitem__(user_id, state)
+        self.move_to_end(user_id)
+        if len(self) > self.max_users:
+            self.popitem(last=False)
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """并发处理不同用户的更新，同一用户的更新按到达顺序逐个处理
+    
+    添加单词、复习等多步操作依赖user_states中的进度，同一用户的更新并发执行会互相覆盖；
+    这样一个用户的慢操作（如导出）也不会阻塞其他用户"""
+    
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES):
+        super().__init__(max_concurrent_updates)
+        self._user_locks: Dict[int, List] = {}  # 用户ID -> [锁, 正在等待或处理的更新数]
+    
+    async def process_update(self, update: object, coroutine) -> None:
         """
+        先在该用户的锁上排队，轮到时才占用并发名额（基类的process_update持有信号量）：
+        同一用户积压的更新只占一个名额，不会占满名额阻塞其他用户
+        """
+        user = getattr(update, 'effective_user', None)
+        if user is None:
+            await super().process_update(update, coroutine)
+            return
+        
+        entry = self._user_locks.get(user.id)
+        if entry is None:
+            entry = self._user_locks[user.id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            # 该用户没有待处理的更新时删除锁，避免锁随用户数增长
+            entry[1] -= 1
+            if not entry[1]:
+                del self._user_locks[user.id]
+    
+    async def do_process_update(self, update: object, coroutine) -> None:
+        await coroutine
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+
+def create_rate_limiter():
+    """创建发送限速器：全局每秒最多30条、每个群组每分钟最多20条（Telegram的限制），
+    被限流（RetryAfter）时等待后自动重试；需要 python-telegram-bot[rate-limiter]，未安装时返回None"""
+    try:
+        from telegram.ext import AIORateLimiter
+        return AIORateLimiter(max_retries=3)
+    except (ImportError, RuntimeError):
+        # 未安装aiolimiter时AIORateLimiter()抛出RuntimeError
+        return None
+
+class GREBot:
+    """GRE词汇学习Bot"""
+    
+    def __init__(self, project_root: Path):
+        self.project_root = Path(project_root)
+        self.db_path = self.project_root / "telegram_bot.db"
+        # 数据库方法都是阻塞调用，处理器中通过asyncio.to_thread放到线程池执行，不阻塞事件循环
+        self.db = DatabaseManager(str(self.db_path))
+        self.user_states = UserStates()  # 用户状态管理（中途放弃的会话不会一直占用内存）
+        self._stats_cache: 'OrderedDict[int, Tuple[float, Dict]]' = OrderedDict()  # 用户ID -> (获取时间, 学习统计)
+        
+        # 加载配置
+        self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+        if not self.bot_token:
+            raise ValueError("请设置TELEGRAM_BOT_TOKEN环境变量")
+        # 设置了TELEGRAM_WEBHOOK_URL（Telegram推送更新的公网HTTPS地址）时使用Webhook模式，否则使用长轮询
+        self.webhook_url = os.getenv('TELEGRAM_WEBHOOK_URL')
+        self.webhook_listen = os.getenv('TELEGRAM_WEBHOOK_LISTEN', '0.0.0.0')
+        self.webhook_port = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8443'))
+        self.webhook_secret = os.getenv('TELEGRAM_WEBHOOK_SECRET')
         
-        await update.message.reply_text(help_text.strip(), parse_mode='Markdown')
+        logger.info(f"Bot初始化完成，数据库路径: {self.db_path}")
+    
+    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """开始命令"""
+        user = update.effective_user
+        
+        # 保存用户信息
+        await asyncio.to_thread(self.db.create_or_update_user, {
+            'user_id': user.id,
+            'username': user.username,
+            'first_name': user.first_name,
+            'language_code': user.language_code
+        })
+        
+        welcome_text = _WELCOME_TEMPLATE.format(first_name=user.first_name)
+        
+        await update.message.reply_text(
+            welcome_text, 
+            parse_mode='Markdown',
+            reply_markup=_START_KEYBOARD
+        )
+    
+    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """帮助命令"""
+        await update.message.reply_text(_HELP_TEXT, parse_mode='Markdown')
     
     async def add_word_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """添加单词命令"""
@@ -512,7 +731,8 @@ class GREBot:
         """完成添加单词"""
         user_id = update.effective_user.id
         
-        if self.db.add_word(user_id, word, definition, pronunciation):
+        if await asyncio.to_thread(self.db.add_word, user_id, word, definition, pronunciation):
+            self._stats_cache.pop(user_id, None)
             success_text = f"✅ **单词添加成功！**\n\n"
             success_text += f"📖 **{word}**\n"
             success_text += f"💭 {definition}\n"
@@ -555,7 +775,7 @@ class GREBot:
                 await update.message.reply_text("❌ 请输入有效的数字（1-50）")
                 return
         
-        words = self.db.get_recent_words(user_id, limit)
+        words = await asyncio.to_thread(self.db.get_recent_words, user_id, limit)
         
         if not words:
             keyboard = [[InlineKeyboardButton("📝 添加单词", callback_data="quick_add")]]
@@ -579,10 +799,10 @@ class GREBot:
             else:
                 status = f"📖 复习{word['review_count']}次"
             
-            text_lines.append(f"`{i:2d}.` **{word['word']}**")
-            text_lines.append(f"     💭 {word['definition']}")
-            text_lines.append(f"     📅 {word['added_date']} | {status}")
-            text_lines.append("")
+            # 每个单词的几行拼成一个字符串，末尾的换行与join的换行构成单词之间的空行
+            text_lines.append(f"`{i:2d}.` **{word['word']}**\n"
+                              f"     💭 {word['definition']}\n"
+                              f"     📅 {word['added_date']} | {status}\n")
         
         text_lines.append("💡 使用 `/review` 开始复习，`/search` 搜索单词")
         
@@ -624,7 +844,7 @@ class GREBot:
     async def perform_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE, query: str):
         """执行搜索"""
         user_id = update.effective_user.id
-        results = self.db.search_words(user_id, query, 20)
+        results = await asyncio.to_thread(self.db.search_words, user_id, query, 20)
         
         if not results:
             await update.message.reply_text(
@@ -637,21 +857,20 @@ class GREBot:
         text_lines.append(f"关键词: `{query}`\n")
         
         for i, word in enumerate(results[:10], 1):  # 显示前10个
-            # 高亮匹配的关键词
+            # 高亮匹配的关键词（全文索引搜索时释义已带高亮；单词本身已是粗体，Markdown不支持嵌套）
             highlighted_word = word['word']
-            highlighted_def = word['definition']
-            
-            text_lines.append(f"`{i:2d}.` **{highlighted_word}**")
-            text_lines.append(f"     💭 {highlighted_def}")
+            highlighted_def = word.get('highlighted_definition', word['definition'])
             
             # 显示复习信息
             if word['review_count'] == 0:
-                text_lines.append(f"     🆕 新词")
+                review_info = "🆕 新词"
             else:
-                next_review = word['next_review_date']
-                text_lines.append(f"     📖 复习{word['review_count']}次 | 下次: {next_review}")
+                review_info = f"📖 复习{word['review_count']}次 | 下次: {word['next_review_date']}"
             
-            text_lines.append("")
+            # 每个单词的几行拼成一个字符串，末尾的换行与join的换行构成单词之间的空行
+            text_lines.append(f"`{i:2d}.` **{highlighted_word}**\n"
+                              f"     💭 {highlighted_def}\n"
+                              f"     {review_info}\n")
         
         if len(results) > 10:
             text_lines.append(f"... 还有 {len(results) - 10} 个结果")
@@ -673,7 +892,7 @@ class GREBot:
             except ValueError:
                 limit = 10
         
-        words = self.db.get_words_for_review(user_id, limit)
+        words = await asyncio.to_thread(self.db.get_words_for_review, user_id, limit)
         
         if not words:
             keyboard = [
@@ -830,7 +1049,8 @@ class GREBot:
             mastered = mastered_map[action]
             difficulty = difficulty_map[action]
             
-            self.db.update_word_review(word_id, mastered, difficulty)
+            await asyncio.to_thread(self.db.update_word_review, word_id, mastered, difficulty)
+            self._stats_cache.pop(user_id, None)
             
             if mastered:
                 state['correct_count'] += 1
@@ -854,15 +1074,8 @@ class GREBot:
         accuracy = (correct_count / total_words * 100) if total_words > 0 else 0
         
         # 记录复习会话
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO review_sessions 
-            (user_id, words_reviewed, correct_answers, session_duration_seconds)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, total_words, correct_count, int(duration)))
-        conn.commit()
-        conn.close()
+        await asyncio.to_thread(self.db.add_review_session, user_id, total_words, correct_count, int(duration))
+        self._stats_cache.pop(user_id, None)
         
         # 清除状态
         self.user_states.pop(user_id, None)
@@ -910,10 +1123,26 @@ class GREBot:
                 reply_markup=reply_markup
             )
     
+    async def _get_user_stats(self, user_id: int) -> Dict:
+        """获取学习统计，STATS_CACHE_TTL秒内重复查看直接使用缓存"""
+        cached = self._stats_cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < STATS_CACHE_TTL:
+            return cached[1]
+        
+        stats = await asyncio.to_thread(self.db.get_user_stats, user_id)
+        now = time.monotonic()
+        # 移到末尾，使缓存按获取时间排序；再从头部清理已过期的条目，
+        # 缓存中只保留最近STATS_CACHE_TTL秒内查看过统计的用户
+        self._stats_cache[user_id] = (now, stats)
+        self._stats_cache.move_to_end(user_id)
+        while now - next(iter(self._stats_cache.values()))[0] >= STATS_CACHE_TTL:
+            self._stats_cache.popitem(last=False)
+        return stats
+    
     async def show_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """显示学习统计"""
         user_id = update.effective_user.id
-        stats = self.db.get_user_stats(user_id)
+        stats = await self._get_user_stats(user_id)
         
         # 构建统计信息
         stats_text = f"📊 **你的学习数据分析**\n\n"
@@ -1051,19 +1280,17 @@ class GREBot:
                 
         else:
             # 智能识别用户意图
-            text_lower = message_text.lower()
-            
-            if any(word in text_lower for word in ['add', '添加', 'new', '新']):
+            if _ADD_INTENT_RE.search(message_text):
                 await update.message.reply_text(
                     "💡 **想要添加单词？**\n\n使用命令：`/add 单词 释义`\n或发送 `/add` 进入交互模式",
                     parse_mode='Markdown'
                 )
-            elif any(word in text_lower for word in ['review', '复习', 'study', '学习']):
+            elif _REVIEW_INTENT_RE.search(message_text):
                 await update.message.reply_text(
                     "💡 **想要开始复习？**\n\n使用命令：`/review`",
                     parse_mode='Markdown'
                 )
-            elif any(word in text_lower for word in ['search', '搜索', 'find', '查找']):
+            elif _SEARCH_INTENT_RE.search(message_text):
                 await update.message.reply_text(
                     "💡 **想要搜索单词？**\n\n使用命令：`/search 关键词`",
                     parse_mode='Markdown'
@@ -1092,54 +1319,32 @@ class GREBot:
         """导出数据"""
         user_id = update.effective_user.id
         
-        # 获取用户所有单词
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT word, definition, pronunciation, added_date, 
-                   last_reviewed_date, review_count, mastery_level
-            FROM words 
-            WHERE user_id = ?
-            ORDER BY added_date DESC
-        ''', (user_id,))
-        
-        words = cursor.fetchall()
-        conn.close()
-        
-        if not words:
-            await update.message.reply_text("📭 没有数据可导出")
-            return
-        
-        # 生成JSON格式数据
-        export_data = {
-            'export_date': datetime.now().isoformat(),
-            'user_id': user_id,
-            'total_words': len(words),
-            'words': [dict(word) for word in words]
-        }
-        
-        # 创建临时文件
+        # 小的导出文件留在内存中，超过1MB才写入磁盘；发送后关闭即自动清理
         import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
-            temp_path = f.name
-        
+        f = tempfile.SpooledTemporaryFile(max_size=1 << 20)
         try:
+            # 把用户所有单词以JSON格式直接写入文件
+            total_words = await asyncio.to_thread(
+                self.db.write_export, user_id, f, datetime.now().isoformat()
+            )
+            
+            if not total_words:
+                await update.message.reply_text("📭 没有数据可导出")
+                return
+            
             # 发送文件
+            f.seek(0)
             await update.message.reply_document(
-                document=open(temp_path, 'rb'),
+                document=f,
                 filename=f"gre_words_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                caption=f"📦 **数据导出完成**\n\n• 总单词数: {len(words)}\n• 导出时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                caption=f"📦 **数据导出完成**\n\n• 总单词数: {total_words}\n• 导出时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
                 parse_mode='Markdown'
             )
         finally:
-            # 清理临时文件
-            os.unlink(temp_path)
+            f.close()
     
-    async def set_bot_commands(self):
-        """设置Bot命令菜单"""
+    async def set_bot_commands(self, application: Application):
+        """设置Bot命令菜单（Application初始化完成后、开始接收更新前调用）"""
         commands = [
             BotCommand("start", "🚀 开始使用"),
             BotCommand("add", "📝 添加单词"),
@@ -1152,15 +1357,26 @@ class GREBot:
             BotCommand("help", "❓ 帮助指南"),
         ]
         
-        app = Application.builder().token(self.bot_token).build()
-        await app.bot.set_my_commands(commands)
+        await application.bot.set_my_commands(commands)
         logger.info("Bot命令菜单设置完成")
     
     def run(self):
         """运行Bot"""
         try:
-            # 创建Application
-            application = Application.builder().token(self.bot_token).build()
+            # 创建Application；默认逐个处理更新，一个慢处理器会阻塞所有用户
+            builder = (
+                Application.builder()
+                .token(self.bot_token)
+                .concurrent_updates(PerUserUpdateProcessor())
+                .post_init(self.set_bot_commands)
+            )
+            # 并发处理后高峰期可能超过Telegram的发送频率限制，有限速器时由它统一排队发送
+            rate_limiter = create_rate_limiter()
+            if rate_limiter is not None:
+                builder.rate_limiter(rate_limiter)
+            else:
+                logger.info("未安装 python-telegram-bot[rate-limiter]，不限制发送速率")
+            application = builder.build()
             
             # 添加处理器
             application.add_handler(CommandHandler("start", self.start))
@@ -1181,23 +1397,29 @@ class GREBot:
                 self.handle_message
             ))
             
-            # 设置Bot命令（异步）
-            async def setup():
-                await self.set_bot_commands()
-            
-            # 运行设置
-            asyncio.create_task(setup())
-            
             logger.info("🤖 GRE Telegram Bot 启动成功")
             print("🤖 GRE Telegram Bot 正在运行...")
             print("按 Ctrl+C 停止")
             
             # 启动Bot
-            application.run_polling()
+            if self.webhook_url:
+                # Webhook模式：收到Telegram的推送后立即返回200，更新放入队列由处理器并发处理
+                # （需要安装 python-telegram-bot[webhooks]）
+                application.run_webhook(
+                    listen=self.webhook_listen,
+                    port=self.webhook_port,
+                    url_path=urlparse(self.webhook_url).path.lstrip('/'),
+                    webhook_url=self.webhook_url,
+                    secret_token=self.webhook_secret
+                )
+            else:
+                application.run_polling()
             
         except Exception as e:
             logger.error(f"Bot运行失败: {e}")
             raise
+        finally:
+            self.db.close()
 
 if __name__ == '__main__':
     import sys